@@ -1,16 +1,76 @@
-import requests
-import os
+import threading
+import time
+from collections import deque
 
-API_KEY = os.getenv("OPENROUTER_API_KEY")  # get from environment on Render
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
+from config import Config
+from log_setup import get_logger, kv
+from metrics import PROMPT_CHARS, RESPONSE_CHARS, UPSTREAM_RESPONSES
+from llm_providers import AIServiceError, CircuitOpenError, build_router, load_backend_configs
+from prompt_builder import build_messages, prompt_size
 
-print("🔐 API Key Found:", bool(API_KEY), "| Length:", len(API_KEY) if API_KEY else 0)
-if not API_KEY:
-    print("⚠️  Warning: OPENROUTER_API_KEY environment variable is not set.")
-    print("   AI responses will not work. Please set OPENROUTER_API_KEY environment variable.")
-    # Don't raise error, just continue without AI functionality
+log = get_logger("ai")
 
-def get_response(messages):
+# AIServiceError and CircuitOpenError live in llm_providers; callers catch them from here
+__all__ = ["AIServiceError", "CircuitOpenError", "call_log", "complete", "get_response",
+           "get_router", "recent_calls", "record_call"]
+
+# Recent per-call payload sizes, newest last; served by /admin/ai-calls
+call_log = deque(maxlen=200)
+
+def record_call(provider, messages, status, answer=None):
+    """Remember prompt and response size for one AI call"""
+    entry = {
+        "at": time.time(),
+        "backend": provider.name,
+        "prompt_messages": len(messages),
+        "prompt_chars": prompt_size(messages),
+        "response_chars": len(answer or ""),
+        "status": status,
+    }
+    call_log.append(entry)
+    UPSTREAM_RESPONSES.inc(backend=provider.name, status=status)
+    PROMPT_CHARS.observe(entry["prompt_chars"])
+    if answer is not None:
+        RESPONSE_CHARS.observe(entry["response_chars"])
+    log.info("AI call", extra=kv(sampled=True, **entry))
+    return entry
+
+def recent_calls(limit=50):
+    """The last `limit` AI calls, newest first"""
+    return list(call_log)[-limit:][::-1] if limit > 0 else []
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    """Build the backend router on first use, so importing this module stays cheap"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = _build_router()
+    return _router
+
+def _build_router():
+    # Every configured backend gets its own circuit breaker; the router picks the fastest healthy one
+    router = build_router(
+        load_backend_configs(Config.LLM_BACKENDS, Config.OPENROUTER_API_KEY, Config.OPENROUTER_MODEL),
+        breaker_settings={
+            "failure_rate_threshold": Config.BREAKER_FAILURE_RATE,
+            "min_calls": Config.BREAKER_MIN_CALLS,
+            "window": Config.BREAKER_WINDOW,
+            "slow_call_seconds": Config.BREAKER_SLOW_CALL_SECONDS,
+            "cooldown": Config.BREAKER_COOLDOWN,
+        },
+        hedge_after=Config.LLM_HEDGE_AFTER,
+        hedge_workers=Config.LLM_HEDGE_WORKERS,
+        on_call=record_call,
+        timeout=Config.LLM_TIMEOUT,
+    )
+    log.info("AI backends configured", extra=kv(backends=[b.name for b in router.backends]))
+    return router
+
+def complete(messages):
     """
     messages should be a list of dicts like:
     [
@@ -19,70 +79,19 @@ def get_response(messages):
         {"role": "assistant", "content": "Hi!"},
         {"role": "user", "content": "What about timings?"}
     ]
-    """
-    if not API_KEY:
-        return "Sorry, AI service is not configured. Please set OPENROUTER_API_KEY environment variable."
-    
-    # Debug: Show conversation context
-    print(f"🧠 AI Context: Processing {len(messages)} messages")
-    if len(messages) > 1:
-        print(f"📝 Last user message: {messages[-1]['content'][:100]}...")
-        print(f"🔄 Conversation length: {len(messages)} messages")
-    
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json",
-        "Referer": "https://gyan-chatbot.onrender.com"  # 👈 required by OpenRouter
-    }
 
-    # Enhanced system message for better context handling
+    Returns the answer text or raises AIServiceError (CircuitOpenError
+    without calling out while every backend's breaker is open).
+    """
+    # Ground the prompt in the knowledge base and cap its size if the caller did not
     if not any(msg["role"] == "system" for msg in messages):
-        system_message = """You are GYAN, a helpful school information chatbot. 
-        
-IMPORTANT CONTEXT RULES:
-1. ALWAYS remember the full conversation history
-2. If user asks follow-up questions, refer back to previous context
-3. If discussing a specific event, person, or topic, maintain that context
-4. Be conversational and reference previous messages when relevant
-5. Keep responses clear and helpful, under 60 words
-6. If user asks "what about X" or "tell me more about X", connect it to previous context
-
-Example: If user asks about "the science fair" and then asks "what about prizes?", 
-you should know they're asking about science fair prizes, not general prizes."""
-        
-        messages.insert(0, {
-            "role": "system",
-            "content": system_message
-        })
+        messages = build_messages(messages)
 
-    data = {
-        "model": "mistralai/mistral-small-3.1-24b-instruct:free",
-        "messages": messages,
-        "temperature": 0.7,  # Slightly creative but consistent
-        "max_tokens": 150    # Reasonable response length
-    }
+    return get_router().chat(messages)
 
+def get_response(messages):
+    """Like complete(), but returns the apology text instead of raising"""
     try:
-        response = requests.post(API_URL, json=data, headers=headers, timeout=30)
-        resp_json = response.json()
-    except requests.exceptions.Timeout:
-        return "Sorry, the AI service is taking too long to respond. Please try again."
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return "Sorry, I couldn't connect to the AI service. Please check your internet connection."
-    except Exception as e:
-        print(f"API did not return JSON: {e}")
-        return "Sorry, I couldn't get an answer from the AI service."
-
-    # Handle rate limit error
-    if response.status_code == 429 or ('error' in resp_json and resp_json.get('error', {}).get('code') == 429):
-        return "Sorry, the AI service is temporarily busy. Please try again later."
-
-    if response.status_code == 200:
-        ai_response = resp_json.get("choices", [{}])[0].get("message", {}).get("content", "")
-        print(f"🤖 AI Response: {ai_response[:100]}...")
-        return ai_response
-    else:
-        error_msg = resp_json.get('error', {}).get('message', 'Unknown error')
-        print(f"API Error {response.status_code}: {error_msg}")
-        return f"Sorry, the AI service returned an error: {error_msg}"
+        return complete(messages)
+    except AIServiceError as e:
+        return str(e)
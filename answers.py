@@ -0,0 +1,214 @@
+"""
+Answer rendering for school_data.json and conclave_data.json entries.
+
+The knowledge base renders every (entity, section) answer once per data
+version, so the local tiers answer by lookup. Rendering never raises on
+incomplete entries; validate() reports them instead.
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+CONCLAVE_SECTIONS = ("rules", "prizes", "timing", "venue", "format", "description", "participants", "registration")
+
+# Fields every conclave event needs for its answers to make sense
+REQUIRED_EVENT_FIELDS = ("event_name", "class_range", "day", "timing", "description")
+
+# Staff role key -> answer, for the single-person roles get_school_info() knows about
+STAFF_ROLES = {
+    "principal": "The Principal is {}",
+    "vice principal": "The Vice Principal is {}",
+    "assistant vice principal": "The Assistant Vice Principal is {}",
+    "school co-ordinator": "The School Co-ordinator is {}",
+    "outside school incharge": "The Outside School Incharge is {}",
+    "events incharge": "The Events Incharge is {}",
+    "registration incharge": "The Registration Incharge is {}",
+    "school captain": "The School Captain is {}",
+    "school vice captain": "The School Vice Captain is {}",
+}
+
+# Staff entries that are lists, rendered as a heading and the joined items
+STAFF_LISTS = {
+    "contact details": ("Contact Details:\n", "\n"),
+    "student volunteers": ("Volunteers: ", ", "),
+    "key_faculty_members": ("Key faculty: ", ", "),
+}
+
+STAFF_TEXT = ("teaching_staff_overview", "facilities_for_teacher_training")
+
+# Sections an alias may point at: "aliases": {"canteen": "infrastructure/Cafeteria", "sports day": "conclave/quest"}
+ALIAS_SECTIONS = ("locations", "infrastructure", "co_curricular", "conclave")
+
+
+def iter_aliases(school_data: Dict) -> Iterator[Tuple[str, str, str]]:
+    """(alias, section, key) for each well-formed "alias": "section/key" entry"""
+    aliases = school_data.get("aliases")
+    if not isinstance(aliases, dict):
+        return
+    for alias, target in aliases.items():
+        section, _, key = str(target).partition("/")
+        if alias and section in ALIAS_SECTIONS and key:
+            yield alias, section, key
+
+
+def _venue(data: Dict, default: str):
+    return data.get("venue") or data.get("location") or data.get("place") or data.get("hall") or default
+
+
+def render_school(school_data: Dict) -> Dict[Tuple[str, str], str]:
+    """(section, key) -> answer for every school_data entry get_school_info() can return"""
+    answers = {}
+    for key, value in school_data.get("locations", {}).items():
+        if isinstance(value, list):
+            answers[("locations", key)] = f"The location of {key} is: {', '.join(value)}."
+        else:
+            answers[("locations", key)] = f"The location of {key} is: {value}."
+
+    for section in ("infrastructure", "co_curricular"):
+        for key, value in school_data.get(section, {}).items():
+            answers[(section, key)] = f"{key}: {value}"
+
+    mv = school_data.get("mission_vision", {})
+    if mv.get("vision"):
+        answers[("mission_vision", "vision")] = f"Our vision: {mv['vision']}"
+    if mv.get("mission"):
+        answers[("mission_vision", "mission")] = f"Our mission: {mv['mission']}"
+    if mv.get("core_values"):
+        answers[("mission_vision", "core_values")] = "Our core values: " + ", ".join(mv["core_values"])
+
+    staff = school_data.get("staff", {})
+    for role, template in STAFF_ROLES.items():
+        if staff.get(role):
+            answers[("staff", role)] = template.format(staff[role])
+    for role, (heading, sep) in STAFF_LISTS.items():
+        if staff.get(role):
+            answers[("staff", role)] = heading + sep.join(staff[role])
+    for role in STAFF_TEXT:
+        if staff.get(role):
+            answers[("staff", role)] = staff[role]
+    dev = staff.get("chatbot-developer")
+    if dev:
+        answers[("staff", "chatbot-developer")] = f"Chatbot Developer: {dev.get('name')} ({dev.get('email')})"
+    return answers
+
+
+def _event_with_defaults(key: str, data: Dict) -> Dict:
+    event = dict(data)
+    event["event_name"] = event.get("event_name") or key
+    for field in ("day", "timing"):
+        event[field] = event.get(field) or "TBA"
+    for field in ("class_range", "description"):
+        event[field] = event.get(field) or "N/A"
+    return event
+
+
+def format_specific_section(data, section: str):
+    """Format response for a specific section of event data"""
+    if section == "rules":
+        return f"📖 Rules for {data['event_name']}:\n" + "\n".join(f"• {r}" for r in data.get("rules", []))
+
+    elif section == "prizes":
+        return f"🏆 Prizes for {data['event_name']}:\n" + "\n".join(f"• {p}" for p in data.get("prizes", []))
+
+    elif section == "timing":
+        duration = data.get("duration", "N/A")
+        return f"📅 {data['event_name']} is scheduled on {data['day']} at {data['timing']} (Duration: {duration})."
+
+    elif section == "venue":
+        return f"📍 Venue for {data['event_name']}: {_venue(data, 'venue details not available')}"
+
+    elif section == "format":
+        return f"🎯 Format of {data['event_name']}:\n{data.get('format', 'N/A')}"
+
+    elif section == "description":
+        return f"ℹ️ About {data['event_name']}:\n{data.get('description', 'N/A')}"
+
+    elif section == "participants":
+        return f"👥 Eligible participants for {data['event_name']}: {data.get('class_range', 'N/A')}"
+
+    elif section == "registration":
+        deadline = data.get("registration_deadline")
+        if deadline:
+            return f"📝 Registration for {data['event_name']} closes on {deadline}."
+        return f"📝 Registration details for {data['event_name']} are not available. Please contact the coordinator."
+
+    return None
+
+
+def format_full_summary(data):
+    """Default: Return a summary of event"""
+    lines = [
+        f"📌 {data['event_name']} (Classes {data.get('class_range', 'N/A')})",
+        f"🗓️ {data['day']} | ⏰ {data['timing']} | ⏳ Duration: {data.get('duration', 'N/A')}",
+        f"📍 Venue: {_venue(data, 'N/A')}",
+        "",
+        f"ℹ️ {data.get('description', 'N/A')}",
+        "",
+        "📖 Rules (sample):",
+    ] + [f"• {rule}" for rule in data.get("rules", [])[:3]] + [
+        "...",
+        "",
+        f"🏆 Awards: {', '.join(data.get('prizes', [])[:2])}..."
+    ]
+    return "\n".join(lines)
+
+
+def render_events(conclave_data: Dict) -> Dict[Tuple[str, str], str]:
+    """
+    (event key, section) -> answer for every conclave event: one per
+    CONCLAVE_SECTIONS entry, "summary" and the one-line "brief" that
+    get_school_info() gives
+    """
+    answers = {}
+    for key, data in conclave_data.items():
+        if not isinstance(data, dict):
+            continue
+        event = _event_with_defaults(key, data)
+        for section in CONCLAVE_SECTIONS:
+            answers[(key, section)] = format_specific_section(event, section)
+        answers[(key, "summary")] = format_full_summary(event)
+        answers[(key, "brief")] = f"{event['event_name']} ({event['class_range']}): {event['description']}"
+    return answers
+
+
+def _problem(source: str, entity: str, field: str, message: str) -> Dict:
+    return {"source": source, "entity": entity, "field": field, "message": message}
+
+
+def validate(school_data: Dict, conclave_data: Dict) -> List[Dict]:
+    """Entries that are missing fields their answers rely on"""
+    problems = []
+    school = "school_data.json"
+    for section in ("locations", "infrastructure", "co_curricular"):
+        for key, value in school_data.get(section, {}).items():
+            if not value:
+                problems.append(_problem(school, f"{section}.{key}", key, "empty value"))
+
+    mv = school_data.get("mission_vision", {})
+    for field in ("vision", "mission", "core_values"):
+        if not mv.get(field):
+            problems.append(_problem(school, "mission_vision", field, "missing"))
+
+    staff = school_data.get("staff", {})
+    for role in list(STAFF_ROLES) + list(STAFF_LISTS) + list(STAFF_TEXT) + ["chatbot-developer"]:
+        if not staff.get(role):
+            problems.append(_problem(school, "staff", role, "missing; questions about it fall through to the AI"))
+
+    aliases = school_data.get("aliases") or {}
+    valid = {alias for alias, section, key in iter_aliases(school_data)
+             if key in (conclave_data if section == "conclave" else school_data.get(section, {}))}
+    for alias, target in aliases.items():
+        if alias not in valid:
+            problems.append(_problem(school, "aliases", alias, f"target {target!r} is not a known section/key"))
+
+    if not conclave_data:
+        problems.append(_problem("conclave_data.json", "(file)", "", "no events; event questions fall through to the AI"))
+    for key, data in conclave_data.items():
+        if not isinstance(data, dict):
+            problems.append(_problem("conclave_data.json", key, "", "event is not an object"))
+            continue
+        for field in REQUIRED_EVENT_FIELDS:
+            if not data.get(field):
+                problems.append(_problem("conclave_data.json", key, field, "missing"))
+        if _venue(data, None) is None:
+            problems.append(_problem("conclave_data.json", key, "venue", "no venue, location, place or hall"))
+    return problems
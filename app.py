@@ -1,61 +1,170 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Blueprint, Flask, render_template, request, jsonify, session, Response, g, send_from_directory, abort
 from uuid import uuid4
+import gc
+import hashlib
 import os
+import time
 
-print("✅ Flask app starting...")
+from change_feed import format_sse
+from compression import compressed
+from chat_history import Message, to_dicts
+from log_setup import get_logger, kv
+from metrics import (REGISTRY, ASK_LATENCY, TIER_LATENCY, ANSWERS, BREAKER_OPEN, LIMITER_TOKENS,
+                     observe_cache)
+from single_flight import SingleFlight, SingleFlightTimeout, prompt_key
+
+log = get_logger("app")
 
 # Import configuration with fallback
 try:
     from config import Config
     Config.validate()
-    print("✅ Configuration loaded")
     SECRET_KEY = Config.SECRET_KEY
     DEBUG_MODE = Config.DEBUG
     PORT = Config.PORT
 except Exception as e:
-    print("⚠️  Warning: Config import failed, using fallback values")
-    print(f"   Error: {e}")
+    log.warning("Config import failed, using fallback values", extra=kv(error=str(e)))
     SECRET_KEY = "supersecret"
     DEBUG_MODE = True
     PORT = 5000
+    Config = None
+
+# Importing support modules; none of them does I/O or opens connections at import time
+try:
+    from ai_response import complete, get_router, recent_calls, AIServiceError, CircuitOpenError
+except Exception as e:
+    log.error("Error in ai_response", extra=kv(error=str(e)))
 
-# Import chat history manager
 try:
-    from chat_history import chat_manager
-    print("✅ Loaded chat history manager")
+    from prompt_builder import build_messages
 except Exception as e:
-    print("❌ Error loading chat history manager:", e)
-    chat_manager = None
+    log.error("Error in prompt_builder", extra=kv(error=str(e)))
 
-# Importing support modules with debug
 try:
-    from ai_response import get_response
-    print("✅ Loaded ai_response.py")
+    from knowledge_base import best_effort_answer, get_knowledge_base
 except Exception as e:
-    print("❌ Error in ai_response:", e)
+    log.error("Error in knowledge_base", extra=kv(error=str(e)))
 
 try:
     from automation import get_school_info
-    print("✅ Loaded automation.py")
 except Exception as e:
-    print("❌ Error in automation:", e)
+    log.error("Error in automation", extra=kv(error=str(e)))
 
 try:
-    from conclave_response import answer_conclave_query
-    print("✅ Loaded conclave_response.py")
+    from conclave_response import answer_conclave_query, context_event, is_follow_up
 except Exception as e:
-    print("❌ Error in conclave_response:", e)
+    log.error("Error in conclave_response", extra=kv(error=str(e)))
+
+bp = Blueprint("gyan", __name__)
+
+# 🛫 Concurrent identical AI prompts share one upstream call
+ai_flight = SingleFlight()
+
+
+class AIBudgetExhausted(Exception):
+    """The AI limiter refused the call this request would have led"""
+
+# Set up by create_app()
+chat_manager = None
+local_limiter = None
+ai_limiter = None
+profiler = None
+TRACE_NAME = None
+
+
+def _init_chat_manager():
+    global chat_manager
+    try:
+        from chat_history import chat_manager as manager
+        chat_manager = manager
+    except Exception as e:
+        log.error("Error loading chat history manager", extra=kv(error=str(e)))
+        chat_manager = None
+
+
+def _init_rate_limits():
+    # 🚦 Token-bucket admission control: generous limits for the local tiers, tight ones for OpenRouter
+    global local_limiter, ai_limiter
+    try:
+        from rate_limiter import RateLimiter, make_backend
+        backend = make_backend(getattr(Config, "RATE_LIMIT_REDIS_URL", None))
+        local_limiter = RateLimiter("local", getattr(Config, "LOCAL_SESSION_RATE", "30/30"),
+                                    getattr(Config, "LOCAL_GLOBAL_RATE", "600/10"), backend)
+        ai_limiter = RateLimiter("ai", getattr(Config, "AI_SESSION_RATE", "5/60"),
+                                 getattr(Config, "AI_GLOBAL_RATE", "20/60"), backend)
+    except Exception as e:
+        log.error("Error setting up rate limiting", extra=kv(error=str(e)))
+        local_limiter = None
+        ai_limiter = None
+
+
+def _init_profiler(app):
+    # 🔬 Opt-in profiling of slow /ask requests
+    global profiler, TRACE_NAME
+    try:
+        from profiling import RequestProfiler, TRACE_NAME
+        profiler = RequestProfiler(
+            directory=getattr(Config, "PROFILE_DIR", "profiles"),
+            sample_rate=getattr(Config, "PROFILE_SAMPLE_RATE", 0),
+            threshold_ms=getattr(Config, "PROFILE_THRESHOLD_MS", 1000),
+            max_traces=getattr(Config, "PROFILE_MAX_TRACES", 50),
+            mode=getattr(Config, "PROFILE_MODE", "cprofile"),
+            admin_token=getattr(Config, "ADMIN_TOKEN", None),
+        )
+        profiler.install(app)
+    except Exception as e:
+        log.error("Error setting up request profiling", extra=kv(error=str(e)))
+        profiler = None
+
+
+def create_app():
+    """
+    Build the Flask app and its services.
+
+    The knowledge base is loaded here rather than on the first question
+    (from the precompiled artefact when it is current), so a pre-forking
+    server started with preloading (e.g. `gunicorn --preload 'app:create_app()'`)
+    loads it once and every worker inherits it warm.
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.secret_key = SECRET_KEY
+    # Compact JSON with UTF-8 text (emoji answers stay 4 bytes instead of 12-byte escapes), also in debug
+    app.json.compact = True
+    app.json.ensure_ascii = False
 
-app = Flask(__name__)
-app.secret_key = SECRET_KEY
+    _init_chat_manager()
+    _init_rate_limits()
+    _init_profiler(app)
+    app.register_blueprint(bp)
 
-# 📝 In-memory chat history for each user session (fallback)
+    try:
+        kb = get_knowledge_base()
+        kb_info = {"kb_snippets": len(kb.snippets), "kb_version": kb.version}
+    except Exception as e:
+        log.error("Error building knowledge base", extra=kv(error=str(e)))
+        kb_info = {}
+    try:
+        get_router()
+    except Exception as e:
+        log.error("Error configuring AI backends", extra=kv(error=str(e)))
+
+    # Everything built so far lives for the whole process. Freezing it keeps the collector from
+    # touching those pages, so preforked workers keep sharing them copy-on-write
+    gc.freeze()
+
+    log.info("App ready", extra=kv(startup_ms=round((time.perf_counter() - started) * 1000, 1), **kb_info,
+                                   chat_history=bool(chat_manager), rate_limits=bool(local_limiter),
+                                   profiling=bool(profiler)))
+    return app
+
+# 📝 In-memory chat history for each user session (fallback), as lists of compact Message records
 chat_history = {}
 
 # 🧠 NEW: Simple context memory - stores last event for each session
 session_context = {}
 
-@app.before_request
+@bp.before_app_request
 def assign_session_id():
     """Assign a unique session ID if not already set"""
     if "session_id" not in session:
@@ -66,36 +175,25 @@ def assign_session_id():
             chat_history[session["session_id"]] = existing_history
         else:
             chat_history[session["session_id"]] = []
-        print(f"🆔 New session created: {session['session_id']}")
+        log.info("New session created", extra=kv(sampled=True, session_id=session["session_id"]))
 
-def save_message_to_history(session_id: str, role: str, content: str):
-    """Save message to both memory and persistent storage"""
+def save_message_to_history(session_id: str, role: str, content: str, source: str = None):
+    """Save message to both memory and persistent storage; source is the tier that answered"""
     # Save to memory
     if session_id not in chat_history:
         chat_history[session_id] = []
-    chat_history[session_id].append({"role": role, "content": content})
+    chat_history[session_id].append(Message(role, content, source=source))
     
     # Save to persistent storage
     if chat_manager:
-        chat_manager.save_message(session_id, role, content)
+        chat_manager.save_message(session_id, role, content, source=source)
 
 def get_context_aware_query(session_id: str, user_query: str):
     """NEW: Simple context system - if user asks about timing/prizes/format without mentioning event, use last known event"""
     
     # Check if this is a follow-up question (timing, prizes, format, etc.)
-    follow_up_keywords = [
-        "timing", "time", "when", "schedule", "date",
-        "prizes", "awards", "rewards", "prize",
-        "format", "how", "process", "structure",
-        "participants", "who", "eligibility", "classes",
-        "registration", "deadline", "apply", "venue", "location"
-    ]
-    
-    is_follow_up = any(keyword in user_query.lower() for keyword in follow_up_keywords)
-    
-    if is_follow_up and session_id in session_context:
+    if is_follow_up(user_query) and session_id in session_context:
         last_event = session_context[session_id]
-        print(f"🧠 Context detected! User asking about '{user_query}' - applying context: '{last_event}'")
         
         # Create multiple context-aware query variations for better matching
         context_queries = [
@@ -106,46 +204,66 @@ def get_context_aware_query(session_id: str, user_query: str):
             f"{user_query.lower()} {last_event}"    # Lowercase query + event
         ]
         
-        print(f"🔍 Context queries to try: {context_queries}")
+        log.debug("Context applied", extra=kv(sampled=True, session_id=session_id, context=last_event,
+                                                context_queries=context_queries))
         return context_queries, True
     
     return [user_query], False
 
 def update_session_context(session_id: str, query: str, response: str):
-    """NEW: Update context memory when we find an event"""
-    
-    response_lower = response.lower()
-    
-    # List of all events from conclave_data.json
-    events = [
-        "plurilogues", "continuum", "quartet", "scriptorium", "sensorium",
-        "quest", "crossconnect", "biblioquest", "newstrack", "visual vocabulary",
-        "united nations reimagined"
-    ]
-    
-    for event in events:
-        if event in response_lower:
-            session_context[session_id] = event
-            print(f"🧠 Updated context for session {session_id}: {event}")
-            return
+    """NEW: Update context memory when we find an event; returns the event it remembered, if any"""
     
-    # Fallback examples
-    if "annual sports meet" in response_lower or "sports meet" in response_lower:
-        session_context[session_id] = "annual sports meet"
-        print(f"🧠 Updated context for session {session_id}: annual sports meet")
+    event = context_event(response)
+    if event:
+        session_context[session_id] = event
+        log.debug("Updated context", extra=kv(sampled=True, session_id=session_id, context=event))
+    return event
 
-@app.route('/')
+def cache_key(query: str) -> str:
+    """A question normalized the way static/script.js keys its answer cache"""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+def kb_version() -> str:
+    try:
+        return get_knowledge_base().version
+    except Exception:
+        return ""
+
+@bp.route('/')
 def home():
-    print("✅ Root URL '/' was accessed.")
     return render_template('index.html')
 
-@app.route('/admin')
+@bp.route('/admin')
 def admin():
     """Admin interface for managing chat sessions"""
     return render_template('admin.html')
 
-@app.route('/ask', methods=['POST'])
+@bp.route('/ask', methods=['POST'])
 def ask():
+    started = time.perf_counter()
+
+    def answered(source, answer, status=200, cacheable=False, **extra):
+        """
+        Record metrics for the answering source and build the JSON response.
+        cacheable answers depend only on the question and the knowledge-base
+        version, so they carry an ETag and may be reused by the browser.
+        """
+        elapsed = time.perf_counter() - started
+        g.answer_source = source
+        ANSWERS.inc(source=source)
+        ASK_LATENCY.observe(elapsed, source=source)
+        log.info("Answered", extra=kv(sampled=True, source=source, ms=round(elapsed * 1000, 1)))
+        response = jsonify(dict(answer=answer, source=source, cacheable=cacheable, **extra))
+        version = kb_version()
+        response.headers["X-KB-Version"] = version
+        if cacheable and version:
+            response.set_etag(f"{version}-{hashlib.sha1(cache_key(user_query).encode('utf-8')).hexdigest()[:16]}")
+            response.cache_control.private = True
+            response.cache_control.max_age = getattr(Config, "ANSWER_CACHE_SECONDS", 3600)
+        else:
+            response.cache_control.no_store = True
+        return response, status
+
     try:
         data = request.get_json()
         if not data:
@@ -153,93 +271,144 @@ def ask():
             
         user_query = data.get("query", "").strip()
         session_id = session["session_id"]
+        g.session_size = len(chat_history.get(session_id, []))
 
-        print(f"\n🔍 New Query Received:")
-        print(f"📥 Query: '{user_query}'")
-        print(f"🆔 Session: {session_id}")
-        print(f"🧠 Current context: {session_context.get(session_id, 'None')}")
+        log.info("Query received", extra=kv(sampled=True, session_id=session_id, query_chars=len(user_query),
+                                            context=session_context.get(session_id)))
 
         if not user_query:
             return jsonify({"answer": "Please ask something meaningful."})
 
+        if local_limiter and not local_limiter.allow(session_id):
+            retry_after = local_limiter.retry_after(session_id)
+            log.warning("Rate limited session", extra=kv(session_id=session_id, retry_after=retry_after))
+            response, status = answered(
+                "rate_limited",
+                f"You're sending messages too quickly. Please wait {retry_after} seconds and try again.",
+                status=429, error="rate_limited",
+            )
+            response.headers["Retry-After"] = str(retry_after)
+            return response, status
+
         # Save user message
         save_message_to_history(session_id, "user", user_query)
 
         # NEW: Get context-aware query
         context_queries, is_context_used = get_context_aware_query(session_id, user_query)
-        
-        print(f"🔍 Processing query: '{context_queries[0]}' (context used: {is_context_used})")
 
         # ✅ 1. Check school_data.json with context
         try:
-            for context_query in context_queries:
-                school_info = get_school_info(context_query)
-                if school_info:
-                    print(f"📚 Answered using school_data.json with query: '{context_query}'")
-                    save_message_to_history(session_id, "assistant", school_info)
-                    update_session_context(session_id, context_query, school_info)
-                    return jsonify({"answer": school_info})
+            with TIER_LATENCY.time(tier="school"):
+                school_info = None
+                for context_query in context_queries:
+                    school_info = get_school_info(context_query)
+                    if school_info:
+                        break
+            if school_info:
+                save_message_to_history(session_id, "assistant", school_info, source="school")
+                # Answers that follow-ups depend on stay uncached: a browser cache hit would skip this update
+                remembered = update_session_context(session_id, context_query, school_info)
+                return answered("school", school_info, cacheable=not (is_context_used or remembered))
         except Exception as e:
-            print(f"❌ Error in school_info: {e}")
+            log.error("Error in school_info", extra=kv(error=str(e)))
 
         # ✅ 2. Check conclave_data.json with context
         try:
-            for context_query in context_queries:
-                conclave_info = answer_conclave_query(context_query)
-                if conclave_info:
-                    print(f"🎤 Answered using conclave_data.json with query: '{context_query}'")
-                    save_message_to_history(session_id, "assistant", conclave_info)
-                    update_session_context(session_id, context_query, conclave_info)
-                    return jsonify({"answer": conclave_info})
+            with TIER_LATENCY.time(tier="conclave"):
+                conclave_info = None
+                for context_query in context_queries:
+                    conclave_info = answer_conclave_query(context_query)
+                    if conclave_info:
+                        break
+            if conclave_info:
+                save_message_to_history(session_id, "assistant", conclave_info, source="conclave")
+                remembered = update_session_context(session_id, context_query, conclave_info)
+                return answered("conclave", conclave_info, cacheable=not (is_context_used or remembered))
         except Exception as e:
-            print(f"❌ Error in conclave_info: {e}")
+            log.error("Error in conclave_info", extra=kv(error=str(e)))
 
-        # ✅ 3. Fallback to AI with chat history
+        # ✅ 3. Fallback to AI with chat history, unless the AI budget is spent
+        ai_started = time.perf_counter()
         try:
             current_history = chat_history.get(session_id, [])
-            
-            print(f"🧠 Sending context to AI:")
-            print(f"   Session: {session_id}")
-            print(f"   Messages in context: {len(current_history)}")
-            if current_history:
-                print(f"   First message: {current_history[0]['content'][:50]}...")
-                print(f"   Last message: {current_history[-1]['content'][:50]}...")
-            
-            ai_answer = get_response(current_history)
-            print("🤖 Answered using OpenRouter AI")
-            save_message_to_history(session_id, "assistant", ai_answer)
-            return jsonify({"answer": ai_answer})
-        except Exception as e:
-            print(f"❌ Error in AI response: {e}")
+
+            # Only the relevant facts and the recent turns that fit the prompt cap are sent
+            ai_messages = build_messages(current_history, retrieval_query=context_queries[0])
+            flight_key = prompt_key(ai_messages)
+
+            # Joining an identical in-flight call costs no upstream request, so only the leader is charged.
+            # With no backend configured or every breaker open nothing goes upstream either: complete()
+            # answers with the matching error and the budget is left alone
+            def admit():
+                if ai_limiter and get_router().candidates() and not ai_limiter.allow(session_id):
+                    raise AIBudgetExhausted()
+
+            ai_answer, shared = ai_flight.do(
+                flight_key,
+                lambda: complete(ai_messages),
+                timeout=getattr(Config, "COALESCE_TIMEOUT", 35),
+                on_lead=admit,
+            )
+            observe_cache("ai_coalesce", shared)
+            TIER_LATENCY.observe(time.perf_counter() - ai_started, tier="ai")
+            save_message_to_history(session_id, "assistant", ai_answer, source="ai")
+            return answered("ai", ai_answer)
+        except AIBudgetExhausted:
+            log.warning("AI budget exhausted - answering from local data only", extra=kv(session_id=session_id))
+            local_answer = best_effort_answer(context_queries[0])
+            save_message_to_history(session_id, "assistant", local_answer, source="degraded")
+            return answered("degraded", local_answer, degraded=True)
+        except CircuitOpenError:
+            log.warning("AI circuit open - answering from local data only", extra=kv(sampled=True))
+            local_answer = best_effort_answer(context_queries[0])
+            save_message_to_history(session_id, "assistant", local_answer, source="degraded")
+            return answered("degraded", local_answer, degraded=True)
+        except AIServiceError as e:
+            TIER_LATENCY.observe(time.perf_counter() - ai_started, tier="ai")
+            ai_answer = str(e)
+            save_message_to_history(session_id, "assistant", ai_answer, source="ai_error")
+            return answered("ai_error", ai_answer)
+        except SingleFlightTimeout as e:
+            log.warning("Timed out waiting for shared AI call", extra=kv(error=str(e)))
+            error_msg = "Sorry, the AI service is taking too long to respond. Please try again."
+            save_message_to_history(session_id, "assistant", error_msg, source="ai_error")
+            return answered("ai_error", error_msg)
+        except Exception:
+            log.exception("Error in AI response")
             error_msg = "Sorry, I'm having trouble processing your request right now. Please try again later."
-            save_message_to_history(session_id, "assistant", error_msg)
-            return jsonify({"answer": error_msg})
+            save_message_to_history(session_id, "assistant", error_msg, source="error")
+            return answered("error", error_msg)
 
-    except Exception as e:
-        print(f"❌ Unexpected error in ask route: {e}")
+    except Exception:
+        log.exception("Unexpected error in ask route")
+        ANSWERS.inc(source="error")
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/chat-history/<session_id>')
+@bp.route('/chat-history/<session_id>')
+@compressed(getattr(Config, "COMPRESS_MIN_BYTES", 500))
 def get_chat_history(session_id):
     """Get chat history for a specific session"""
     try:
         if chat_manager:
             history = chat_manager.load_session_history(session_id)
-            return jsonify({"session_id": session_id, "messages": history})
+            return jsonify({"session_id": session_id, "messages": to_dicts(history)})
         else:
             history = chat_history.get(session_id, [])
-            return jsonify({"session_id": session_id, "messages": history, "note": "from memory"})
+            return jsonify({"session_id": session_id, "messages": to_dicts(history), "note": "from memory"})
     except Exception as e:
-        print(f"❌ Error getting chat history: {e}")
+        log.error("Error getting chat history", extra=kv(session_id=session_id, error=str(e)))
         return jsonify({"error": "Failed to load chat history"}), 500
 
-@app.route('/sessions')
+@bp.route('/sessions')
+@compressed(getattr(Config, "COMPRESS_MIN_BYTES", 500))
 def list_sessions():
-    """List all available chat sessions"""
+    """List all available chat sessions; last_id is where /admin/events?since= picks up from"""
     try:
         if chat_manager:
+            # Read before listing, so a change made meanwhile is replayed rather than lost
+            last_id = chat_manager.feed.last_id
             sessions = chat_manager.list_all_sessions()
-            return jsonify({"sessions": sessions})
+            return jsonify({"sessions": sessions, "last_id": last_id})
         else:
             memory_sessions = [
                 {
@@ -251,44 +420,117 @@ def list_sessions():
             ]
             return jsonify({"sessions": memory_sessions, "note": "from memory"})
     except Exception as e:
-        print(f"❌ Error listing sessions: {e}")
+        log.error("Error listing sessions", extra=kv(error=str(e)))
         return jsonify({"error": "Failed to list sessions"}), 500
 
-@app.route('/clear-session/<session_id>', methods=['DELETE'])
+@bp.route('/admin/events')
+def admin_events():
+    """
+    Server-sent events for the admin dashboard: "session", "message", "deleted" and "reset".
+    ?since=<last_id from /sessions> replays what changed after that listing; a reconnect's
+    Last-Event-ID takes precedence.
+    """
+    if not chat_manager:
+        return jsonify({"error": "Chat history not available"}), 503
+    subscription = chat_manager.feed.subscribe(request.headers.get("Last-Event-ID") or request.args.get("since"))
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                events = subscription.get(timeout=15)
+                if not events:
+                    yield ": keepalive\n\n"  # also how a closed connection gets noticed
+                for event_id, event_type, data in events:
+                    yield format_sse(event_id, event_type, data)
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@bp.route('/admin/rate-limits')
+def rate_limit_status():
+    """Current limiter state for monitoring"""
+    limiters = {l.name: l.status() for l in (local_limiter, ai_limiter) if l}
+    return jsonify({"enabled": bool(limiters), "limiters": limiters, "coalescing": ai_flight.status()})
+
+@bp.route('/admin/circuit-breaker')
+def circuit_breaker_status():
+    """Breaker state, latency and error rate of every AI backend"""
+    try:
+        return jsonify(get_router().status())
+    except NameError:
+        return jsonify({"error": "AI service not loaded"}), 503
+
+@bp.route('/admin/ai-calls')
+def ai_calls():
+    """Prompt and response size, backend and status of the most recent AI calls (?limit=, max 200)"""
+    try:
+        limit = min(max(request.args.get("limit", 50, type=int), 0), 200)
+        return jsonify({"calls": recent_calls(limit)})
+    except NameError:
+        return jsonify({"error": "AI service not loaded"}), 503
+
+@bp.route('/metrics')
+@compressed(getattr(Config, "COMPRESS_MIN_BYTES", 500))
+def metrics():
+    """Prometheus text exposition of latency, answer-source, cache and upstream metrics"""
+    try:
+        for backend in get_router().backends:
+            BREAKER_OPEN.set(0 if backend.breaker.state == "closed" else 1, backend=backend.name)
+    except NameError:
+        pass
+    for limiter in (local_limiter, ai_limiter):
+        if limiter:
+            tokens = limiter.status().get("global_tokens_available")
+            if tokens is not None:
+                LIMITER_TOKENS.set(tokens, limiter=limiter.name)
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@bp.route('/admin/profiles')
+def list_profiles():
+    """Captured slow-request traces, newest first"""
+    if not profiler:
+        return jsonify({"enabled": False, "traces": []})
+    return jsonify({"enabled": True, "config": profiler.status(), "traces": profiler.list_traces()})
+
+@bp.route('/admin/profiles/<name>')
+def download_profile(name):
+    """Download one trace (.prof for cProfile/snakeviz, .folded for flamegraph tools)"""
+    if not profiler or not TRACE_NAME.match(name):
+        abort(404)
+    return send_from_directory(os.path.abspath(profiler.directory), name, as_attachment=True)
+
+@bp.route('/clear-session/<session_id>', methods=['DELETE'])
 def clear_session(session_id):
     """Clear chat history for a specific session"""
     try:
         if chat_manager:
             success = chat_manager.delete_session(session_id)
-            if success:
-                print(f"✅ Cleared persistent session: {session_id}")
         else:
             success = False
         
         if session_id in chat_history:
             del chat_history[session_id]
-            print(f"✅ Cleared memory session: {session_id}")
             success = True
         
         if session_id in session_context:
             del session_context[session_id]
-            print(f"🧠 Cleared context for session: {session_id}")
             success = True
         
         if success:
+            log.info("Cleared session", extra=kv(session_id=session_id))
             return jsonify({"message": f"Session {session_id} cleared successfully"})
         else:
             return jsonify({"error": "Session not found"}), 404
             
     except Exception as e:
-        print(f"❌ Error clearing session: {e}")
+        log.error("Error clearing session", extra=kv(session_id=session_id, error=str(e)))
         return jsonify({"error": "Failed to clear session"}), 500
 
 if __name__ == '__main__':
-    print("🚀 Running Flask server...")
-    print(f"✅ Flask app is running on port {PORT}")
-    print("✅ Ready to handle queries!")
-    print("💾 Chat history will be saved to 'chat_sessions' directory")
-    print("🔧 Admin interface available at: /admin")
-    print("🧠 NEW: Simple context system enabled!")
+    # Importing this module only defines the factory; the app is built when served
+    app = create_app()
+    log.info("Running Flask server", extra=kv(port=PORT, admin="/admin", metrics="/metrics"))
     app.run(host='0.0.0.0', port=PORT, debug=DEBUG_MODE)
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the /ask pipeline.
+
+    python -m benchmarks micro             # per-function timings
+    python -m benchmarks corpus -o q.jsonl # synthetic query corpus from the JSON data
+    python -m benchmarks load              # end-to-end load against the Flask app + stub LLM
+
+Run from the repository root. Results print as plain tables and can be
+written as JSON with --json for comparing runs.
+"""
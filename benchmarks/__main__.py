@@ -0,0 +1,53 @@
+import argparse
+
+from benchmarks.common import write_json
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="GYAN /ask pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    micro = sub.add_parser("micro", help="time the local tiers and chat history storage")
+    micro.add_argument("--repeat", type=int, default=20)
+    micro.add_argument("--json", metavar="PATH")
+
+    corpus = sub.add_parser("corpus", help="write the synthetic query corpus as JSONL")
+    corpus.add_argument("-o", "--output", default="bench_corpus.jsonl")
+    corpus.add_argument("--seed", type=int, default=42)
+
+    load = sub.add_parser("load", help="end-to-end load test with a stub LLM server")
+    load.add_argument("--users", type=int, default=10)
+    load.add_argument("--duration", type=float, default=20.0)
+    load.add_argument("--llm-latency", type=float, default=0.3, help="stub LLM latency in seconds")
+    load.add_argument("--llm-error-rate", type=float, default=0.0, help="share of stub LLM calls answered with 429")
+    load.add_argument("--json", metavar="PATH")
+
+    encoding = sub.add_parser("encoding", help="session file encodings and response compression on a corpus")
+    encoding.add_argument("--dir", default="chat_sessions", help="session files to measure")
+    encoding.add_argument("--repeat", type=int, default=5)
+    encoding.add_argument("--json", metavar="PATH")
+
+    args = parser.parse_args()
+    if args.command == "micro":
+        from benchmarks import micro
+        rows = micro.run(repeat=args.repeat)
+        if args.json:
+            write_json(args.json, rows)
+    elif args.command == "encoding":
+        from benchmarks import encoding
+        rows = encoding.run(storage_dir=args.dir, repeat=args.repeat)
+        if args.json:
+            write_json(args.json, rows)
+    elif args.command == "corpus":
+        from benchmarks.corpus import write_corpus
+        write_corpus(args.output, seed=args.seed)
+    elif args.command == "load":
+        from benchmarks import loadgen
+        report = loadgen.run(users=args.users, duration=args.duration,
+                             llm_latency=args.llm_latency, llm_error_rate=args.llm_error_rate)
+        if args.json:
+            write_json(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Synthetic query corpus built from school_data.json and conclave_data.json"""
+
+import json
+import os
+import random
+from typing import Dict, List
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Questions no local tier can answer, so they exercise the AI fallback
+AI_QUESTIONS = [
+    "what is photosynthesis",
+    "can you help me write a speech for assembly",
+    "explain newton's third law",
+    "give me tips for exam preparation",
+    "what is the capital of australia",
+    "how do I stay calm before a debate",
+]
+
+# Follow-ups that rely on session_context remembering the last event
+FOLLOW_UPS = ["when is it?", "what about prizes?", "where is it held?", "what are the rules?",
+              "who can participate?", "how do I register?"]
+
+
+def _load(filename: str) -> Dict:
+    try:
+        with open(os.path.join(BASE_PATH, filename), encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def build_corpus(seed: int = 42, ai_share: float = 0.15) -> List[Dict]:
+    """
+    Query records: {"tier": expected tier, "queries": [...]}. Single questions
+    have one query; follow-up sequences have several, to be sent in order on
+    the same session.
+    """
+    rng = random.Random(seed)
+    school = _load("school_data.json")
+    conclave = _load("conclave_data.json")
+    records: List[Dict] = []
+
+    for key in school.get("locations", {}):
+        template = rng.choice(["where is {}", "{} location", "where can I find {}?", "which room is {}"])
+        records.append({"tier": "school", "queries": [template.format(key)]})
+    for section in ("infrastructure", "co_curricular"):
+        for key in school.get(section, {}):
+            records.append({"tier": "school", "queries": [rng.choice(["tell me about {}", "{}?"]).format(key)]})
+    for question in ("what is the school vision", "what is our mission", "what are the core values"):
+        records.append({"tier": "school", "queries": [question]})
+    for key in school.get("staff", {}):
+        if isinstance(school["staff"][key], str) and len(key) < 30:
+            records.append({"tier": "school", "queries": [f"who is the {key.replace('_', ' ')}"]})
+
+    for key, event in conclave.items():
+        name = event.get("event_name", key) if isinstance(event, dict) else key
+        records.append({"tier": "conclave", "queries": [f"tell me about {name}"]})
+        records.append({"tier": "conclave", "queries": [name] + rng.sample(FOLLOW_UPS, 3)})
+
+    # Sports meet follow-ups work even without conclave data
+    records.append({"tier": "school", "queries": ["annual sports meet", "when is it?", "what about prizes?"]})
+
+    local = len(records)
+    ai_count = max(1, int(local * ai_share / (1 - ai_share)))
+    for i in range(ai_count):
+        records.append({"tier": "ai", "queries": [AI_QUESTIONS[i % len(AI_QUESTIONS)]]})
+
+    rng.shuffle(records)
+    return records
+
+
+def flat_queries(records: List[Dict]) -> List[str]:
+    return [q for r in records for q in r["queries"]]
+
+
+def write_corpus(path: str, seed: int = 42):
+    records = build_corpus(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    sequences = sum(1 for r in records if len(r["queries"]) > 1)
+    print(f"Wrote {len(records)} records ({sequences} follow-up sequences, "
+          f"{len(flat_queries(records))} queries) to {path}")
+
+
+def read_corpus(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
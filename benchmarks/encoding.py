@@ -0,0 +1,70 @@
+"""Session file encodings and response compression over a chat_sessions/ corpus"""
+
+import gzip
+import json
+import os
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import print_table, summarize, time_calls
+
+
+def _codecs() -> List[Tuple[str, Callable, Callable]]:
+    """(name, encode, decode) for the old indented format and every SESSION_FORMAT installed here"""
+    import session_codec
+
+    codecs = [
+        ("json-indent", lambda d: json.dumps(d, indent=2, ensure_ascii=False).encode("utf-8"),
+         lambda b: json.loads(b.decode("utf-8"))),
+        ("json", lambda d: session_codec.encode(d, "json"), lambda b: json.loads(b.decode("utf-8"))),
+    ]
+    if session_codec.available("orjson"):
+        codecs.append(("orjson", lambda d: session_codec.encode(d, "orjson"), session_codec.orjson.loads))
+    if session_codec.available("msgpack"):
+        codecs.append(("msgpack", lambda d: session_codec.encode(d, "msgpack"), session_codec.decode))
+    return codecs
+
+
+def _compressed_size(blobs: List[bytes], encoding: str) -> object:
+    from compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+
+    if encoding == "br":
+        if brotli is None:
+            return "n/a"
+        return sum(len(brotli.compress(b, quality=BROTLI_QUALITY)) for b in blobs)
+    return sum(len(gzip.compress(b, GZIP_LEVEL)) for b in blobs)
+
+
+def run(storage_dir: str = "chat_sessions", repeat: int = 5) -> List[Dict]:
+    import session_codec
+
+    paths = sorted(e.path for e in os.scandir(storage_dir)
+                   if e.name.startswith("session_") and e.name.endswith(".json"))
+    sessions = [session_codec.load(p) for p in paths]
+    if not sessions:
+        print(f"No session files in {storage_dir}")
+        return []
+    messages = sum(len(s.get("messages", [])) for s in sessions)
+    print(f"{len(sessions)} sessions, {messages} messages from {storage_dir}\n")
+
+    rows, baseline = [], None
+    for name, encode, decode in _codecs():
+        blobs = [encode(s) for s in sessions]
+        size = sum(len(b) for b in blobs)
+        baseline = baseline or size
+        encode_ms = summarize(time_calls(encode, [(s,) for s in sessions], repeat))
+        decode_ms = summarize(time_calls(decode, [(b,) for b in blobs], repeat))
+        rows.append({
+            "encoding": name,
+            "bytes": size,
+            "vs_indent": f"{size / baseline:.0%}",
+            "encode_mean_ms": encode_ms["mean_ms"],
+            "encode_p95_ms": encode_ms["p95_ms"],
+            "decode_mean_ms": decode_ms["mean_ms"],
+            "decode_p95_ms": decode_ms["p95_ms"],
+            # What /chat-history would send for this body with gzip or brotli negotiated
+            "gzip_bytes": _compressed_size(blobs, "gzip"),
+            "br_bytes": _compressed_size(blobs, "br"),
+        })
+    print_table(rows, ["encoding", "bytes", "vs_indent", "encode_mean_ms", "encode_p95_ms",
+                       "decode_mean_ms", "decode_p95_ms", "gzip_bytes", "br_bytes"])
+    return rows
@@ -0,0 +1,107 @@
+"""End-to-end load generator: real Flask app and HTTP server, stub LLM backend"""
+
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.common import print_table, summarize
+from benchmarks.corpus import build_corpus
+from benchmarks.stub_llm import StubLLMServer
+
+
+def _start_app(stub: StubLLMServer, storage_dir: str):
+    """Import the app pointed at the stub, with limits out of the way, and serve it on a free port"""
+    os.environ["LLM_BACKENDS"] = json.dumps([{"name": "stub", "base_url": stub.base_url, "model": "stub"}])
+    for name in ("AI_SESSION_RATE", "AI_GLOBAL_RATE", "LOCAL_SESSION_RATE", "LOCAL_GLOBAL_RATE"):
+        os.environ.setdefault(name, "1000000/1")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    flask_app = app_module.create_app()
+    if app_module.chat_manager:
+        app_module.chat_manager.storage_dir = storage_dir
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def _user(base_url: str, records: List[Dict], deadline: float, results: List, seed: int):
+    import requests
+
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        # A fresh cookie jar per sequence is a fresh session, like a new student
+        with requests.Session() as http:
+            for query in rng.choice(records)["queries"]:
+                started = time.perf_counter()
+                try:
+                    response = http.post(f"{base_url}/ask", json={"query": query}, timeout=60)
+                    outcome = str(response.status_code)
+                except Exception as e:
+                    outcome = type(e).__name__
+                results.append((time.perf_counter() - started, outcome))
+                if time.monotonic() >= deadline:
+                    return
+
+
+def _answer_sources(base_url: str) -> Dict[str, int]:
+    import requests
+
+    sources = {}
+    for line in requests.get(f"{base_url}/metrics", timeout=10).text.splitlines():
+        if line.startswith('gyan_answers_total{source="'):
+            labels, value = line.rsplit(" ", 1)
+            sources[labels.split('"')[1]] = int(float(value))
+    return sources
+
+
+def run(users: int = 10, duration: float = 20.0, llm_latency: float = 0.3, llm_error_rate: float = 0.0) -> Dict:
+    storage_dir = tempfile.mkdtemp(prefix="gyan-load-")
+    stub = StubLLMServer(latency=llm_latency, error_rate=llm_error_rate).start()
+    server, base_url = _start_app(stub, storage_dir)
+    records = build_corpus()
+    results: List = []
+    try:
+        print(f"Running {users} users for {duration:.0f}s against {base_url} (stub LLM {llm_latency * 1000:.0f}ms)...")
+        deadline = time.monotonic() + duration
+        started = time.perf_counter()
+        threads = [threading.Thread(target=_user, args=(base_url, records, deadline, results, i))
+                   for i in range(users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        sources = _answer_sources(base_url)
+    finally:
+        server.shutdown()
+        stub.stop()
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+    latencies = [lat for lat, _ in results]
+    report = {
+        "users": users,
+        "duration_s": round(elapsed, 2),
+        "requests": len(results),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        "outcomes": dict(Counter(outcome for _, outcome in results)),
+        "answer_sources": sources,
+        "upstream_requests": stub.requests,
+        "latency": summarize(latencies),
+    }
+    print_table([{**report["latency"], "requests": report["requests"], "rps": report["throughput_rps"]}],
+                ["requests", "rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    print(f"\nOutcomes: {report['outcomes']}")
+    print(f"Answer sources: {sources}")
+    print(f"Upstream LLM requests: {stub.requests}")
+    return report
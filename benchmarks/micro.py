@@ -0,0 +1,81 @@
+"""Microbenchmarks for the local answer tiers and chat history storage"""
+
+import shutil
+import tempfile
+from typing import Dict, List
+
+from benchmarks.common import print_table, summarize, time_calls
+from benchmarks.corpus import build_corpus, flat_queries
+
+SESSION_SIZES = (10, 100, 500)
+SESSION_COUNTS = (10, 100, 1000)
+
+
+def bench_tiers(queries: List[str], repeat: int) -> List[Dict]:
+    from automation import get_school_info, normalize
+    from conclave_response import answer_conclave_query
+
+    args = [(q,) for q in queries]
+    rows = []
+    for name, fn in (("normalize", normalize),
+                     ("get_school_info", get_school_info),
+                     ("answer_conclave_query", answer_conclave_query)):
+        rows.append({"benchmark": name, "param": f"{len(queries)} queries", **summarize(time_calls(fn, args, repeat))})
+    return rows
+
+
+def bench_kb_load(repeat: int) -> List[Dict]:
+    import knowledge_base
+
+    workdir = tempfile.mkdtemp(prefix="gyan-bench-")
+    try:
+        path = f"{workdir}/knowledge_base.bin"
+        knowledge_base.build_artifact(path)
+        return [
+            {"benchmark": "kb_build_json", "param": "", **summarize(time_calls(knowledge_base._build_from_json, [()] * repeat))},
+            {"benchmark": "kb_load_artifact", "param": "", **summarize(time_calls(knowledge_base.load_artifact, [(path,)] * repeat))},
+        ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _seed_session(manager, session_id: str, messages: int):
+    from chat_history import Message
+
+    history = [Message("user" if i % 2 == 0 else "assistant",
+                       f"message {i} about the physics lab and the annual sports meet", 1755354132)
+               for i in range(messages)]
+    manager.save_session_history(session_id, history)
+
+
+def bench_storage(repeat: int) -> List[Dict]:
+    from chat_history import ChatHistoryManager
+
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="gyan-bench-")
+    try:
+        for size in SESSION_SIZES:
+            manager = ChatHistoryManager(f"{workdir}/size{size}")
+            _seed_session(manager, "bench", size)
+            # Each call appends, so the session grows by `repeat` messages over the run
+            samples = time_calls(manager.save_message, [("bench", "user", "where is the physics lab?")] * repeat)
+            rows.append({"benchmark": "save_message", "param": f"{size} msgs/session", **summarize(samples)})
+            samples = time_calls(manager.load_session_history, [("bench",)] * repeat)
+            rows.append({"benchmark": "load_session", "param": f"{size} msgs/session", **summarize(samples)})
+
+        for count in SESSION_COUNTS:
+            manager = ChatHistoryManager(f"{workdir}/count{count}")
+            for i in range(count):
+                _seed_session(manager, f"s{i:05d}", 20)
+            samples = time_calls(manager.list_all_sessions, [()] * max(1, repeat // 10))
+            rows.append({"benchmark": "list_all_sessions", "param": f"{count} sessions", **summarize(samples)})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def run(repeat: int = 20) -> List[Dict]:
+    queries = flat_queries(build_corpus())
+    rows = bench_tiers(queries, max(1, repeat // 10)) + bench_kb_load(repeat) + bench_storage(repeat)
+    print_table(rows, ["benchmark", "param", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    return rows
@@ -0,0 +1,110 @@
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from log_setup import get_logger, kv
+
+log = get_logger("change_feed")
+
+
+class Subscription:
+    """One listener's queue of (id, type, data) events"""
+
+    def __init__(self, feed: "ChangeFeed", maxsize: int):
+        self._feed = feed
+        self._queue: "queue.Queue[Tuple[int, str, Dict]]" = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def _offer(self, event: Tuple[int, str, Dict]):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # The listener fell too far behind; it gets a reset instead of a gap
+            self.overflowed = True
+
+    def get(self, timeout: float) -> List[Tuple[int, str, Dict]]:
+        """Events published since the last call, waiting up to timeout for the first one"""
+        if self.overflowed:
+            self.overflowed = False
+            self._drain()
+            return [(self._feed.last_id, "reset", {})]
+        try:
+            events = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        events.extend(self._drain())
+        return events
+
+    def _drain(self) -> List[Tuple[int, str, Dict]]:
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self._feed._unsubscribe(self)
+
+
+class ChangeFeed:
+    """
+    In-process publish/subscribe of chat storage changes.
+
+    Events carry increasing ids and the last `history` of them are kept, so
+    a reconnecting listener resumes from its last id; if that is too old it
+    gets a single "reset" event and should reload everything.
+    """
+
+    def __init__(self, history: int = 500, subscriber_queue: int = 1000):
+        self._ids = itertools.count(1)
+        self._recent: deque = deque(maxlen=history)
+        self._subscribers: List[Subscription] = []
+        self._subscriber_queue = subscriber_queue
+        self._lock = threading.Lock()
+        self.last_id = 0
+
+    def publish(self, event_type: str, data: Dict):
+        with self._lock:
+            event = (next(self._ids), event_type, data)
+            self.last_id = event[0]
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber._offer(event)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(self, self._subscriber_queue)
+        with self._lock:
+            self._subscribers.append(subscription)
+            if last_event_id:
+                try:
+                    last_seen = int(last_event_id)
+                except ValueError:
+                    last_seen = -1
+                oldest = self._recent[0][0] if self._recent else self.last_id + 1
+                if 0 <= last_seen <= self.last_id and last_seen >= oldest - 1:
+                    for event in self._recent:
+                        if event[0] > last_seen:
+                            subscription._offer(event)
+                else:
+                    subscription.overflowed = True
+        log.info("Change feed listener connected", extra=kv(listeners=self.listeners))
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def listeners(self) -> int:
+        return len(self._subscribers)
+
+
+def format_sse(event_id: int, event_type: str, data: Dict) -> str:
+    """One server-sent event frame"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -1,7 +1,17 @@
-import json
 import os
-from datetime import datetime, timezone
-from typing import List, Dict, Optional
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Dict, Optional, Union
+
+import session_codec
+from config import Config
+from log_setup import get_logger, kv
+from metrics import PERSISTENCE_LATENCY
+from change_feed import ChangeFeed
+from session_index import SessionIndex
+
+log = get_logger("chat_history")
 
 def _iso_utc_now() -> str:
     # Always store timestamps in UTC with Z
@@ -27,57 +37,162 @@ def _as_utc_string(ts: str) -> str:
         # Fallback: just append Z
         return ts.split(".")[0] + "Z"
 
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+def _parse_epoch(ts) -> Optional[int]:
+    """ISO timestamp (naive means UTC) or epoch number -> integer epoch seconds"""
+    if ts is None or ts == "":
+        return None
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    try:
+        if len(ts) == 20 and ts[19] == "Z":
+            # The "YYYY-MM-DDTHH:MM:SSZ" that _format_epoch writes: skip building an aware datetime
+            return (datetime.fromisoformat(ts[:19]) - _EPOCH) // _SECOND
+        dt = datetime.fromisoformat(ts[:-1] + "+00:00" if ts.endswith("Z") else ts)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+    except (TypeError, ValueError):
+        return None
+
+def _format_epoch(ts: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+class Message:
+    """
+    One chat message as held in memory: interned role, content and integer
+    UTC epoch seconds (None if unknown), plus the tier that produced an
+    assistant reply when known. Converted to and from the JSON dict shape
+    only when sessions are read, written or returned by the API.
+    """
+    __slots__ = ("role", "content", "ts", "source")
+
+    def __init__(self, role: str, content: str, ts: Optional[int] = None, source: Optional[str] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.ts = int(time.time()) if ts is None else ts
+        self.source = sys.intern(source) if source else None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Message":
+        message = cls(data.get("role") or "unknown", data.get("content") or "", 0, data.get("source"))
+        message.ts = _parse_epoch(data.get("timestamp"))  # keep None for records without a usable timestamp
+        return message
+
+    def to_dict(self) -> Dict:
+        data = {"role": self.role, "content": self.content}
+        if self.ts is not None:
+            data["timestamp"] = _format_epoch(self.ts)
+        if self.source:
+            data["source"] = self.source
+        return data
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.content[:30]!r}, {self.ts})"
+
+def to_messages(items: Iterable[Union[Message, Dict]]) -> List[Message]:
+    return [m if isinstance(m, Message) else Message.from_dict(m) for m in items if isinstance(m, (Message, dict))]
+
+def to_dicts(messages: Iterable[Message]) -> List[Dict]:
+    return [m.to_dict() for m in messages]
+
+def read_session_info(file_path: str, session_id: str) -> Optional[Dict]:
+    """Metadata straight from a session file"""
+    try:
+        if not os.path.exists(file_path):
+            return None
+        session_data = session_codec.load(file_path)
+
+        return {
+            "session_id": session_id,
+            "created_at": _as_utc_string(session_data.get("created_at")),
+            "last_updated": _as_utc_string(session_data.get("last_updated")),
+            "message_count": session_data.get("message_count", 0),
+            "last_message": session_data.get("last_message", ""),
+            "size_bytes": os.path.getsize(file_path),
+        }
+    except Exception as e:
+        log.error("Error getting session info", extra=kv(session_id=session_id, error=str(e)))
+        return None
+
 class ChatHistoryManager:
-    def __init__(self, storage_dir="chat_sessions"):
+    def __init__(self, storage_dir="chat_sessions", fmt: Optional[str] = None):
         self.storage_dir = storage_dir
+        # Encoding for writes (SESSION_FORMAT); reads detect whatever a file was written with
+        self.fmt = session_codec.resolve(fmt or getattr(Config, "SESSION_FORMAT", "json"))
+        self._index = None
+        # Saves and deletes are published here for live listeners (the admin dashboard)
+        self.feed = ChangeFeed()
         self.ensure_storage_dir()
+
+    @property
+    def index(self) -> SessionIndex:
+        """Metadata index of storage_dir, built from the session files if it does not exist yet"""
+        if self._index is None or self._index.storage_dir != self.storage_dir:
+            self.ensure_storage_dir()
+            self._index = SessionIndex(self.storage_dir)
+            if not self._index.exists():
+                self.rebuild_index()
+        return self._index
     
     def ensure_storage_dir(self):
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
-            print(f"✅ Created chat storage directory: {self.storage_dir}")
+            log.info("Created chat storage directory", extra=kv(path=self.storage_dir))
     
     def get_session_file_path(self, session_id: str) -> str:
         return os.path.join(self.storage_dir, f"session_{session_id}.json")
     
-    def save_message(self, session_id: str, role: str, content: str) -> bool:
+    def save_message(self, session_id: str, role: str, content: str, source: Optional[str] = None) -> bool:
         try:
-            history = self.load_session_history(session_id)
-
-            message = {
-                "role": role,
-                "content": content,
-                "timestamp": _iso_utc_now()   # ✅ UTC with Z
-            }
-            history.append(message)
-            
-            return self.save_session_history(session_id, history)
+            with PERSISTENCE_LATENCY.time(operation="save_message"):
+                return self._append_message(session_id, role, content, source)
         except Exception as e:
-            print(f"❌ Error saving message: {e}")
+            log.error("Error saving message", extra=kv(session_id=session_id, error=str(e)))
             return False
+
+    def _append_message(self, session_id: str, role: str, content: str, source: Optional[str] = None) -> bool:
+        # The session file is still read and rewritten whole, but the stored messages are carried through
+        # as the dicts they were read as; only the new one is converted
+        file_path = self.get_session_file_path(session_id)
+        existing = None
+        if os.path.exists(file_path):
+            with PERSISTENCE_LATENCY.time(operation="load_session"):
+                existing = session_codec.load(file_path)
+        messages = [m for m in (existing or {}).get("messages", []) if isinstance(m, dict)]
+
+        message = Message(role, content, source=source).to_dict()
+        messages.append(message)
+
+        saved = self._write_session(session_id, messages, existing)
+        if saved:
+            self.feed.publish("message", {"session_id": session_id, "message": message})
+        return saved
     
-    def save_session_history(self, session_id: str, history: List[Dict]) -> bool:
+    def save_session_history(self, session_id: str, history: List[Union[Message, Dict]]) -> bool:
+        return self._write_session(session_id, to_dicts(to_messages(history)))
+
+    def _write_session(self, session_id: str, messages: List[Dict], existing: Optional[Dict] = None) -> bool:
         try:
             file_path = self.get_session_file_path(session_id)
 
-            # Preserve existing created_at if the file already exists
+            # Preserve existing created_at if the session already exists
             created_at = _iso_utc_now()
-            if os.path.exists(file_path):
+            indexed = self.index.get(session_id)
+            if indexed and indexed.get("created_at"):
+                created_at = indexed["created_at"]
+            elif existing is not None or os.path.exists(file_path):
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        existing = json.load(f)
+                    existing = existing if existing is not None else session_codec.load(file_path)
                     created_at = _as_utc_string(existing.get("created_at")) or created_at
                 except Exception:
                     pass  # if anything fails, keep the fresh created_at
 
-            # Normalize any old message timestamps (no tz -> add Z)
-            for m in history:
-                if isinstance(m, dict) and "timestamp" in m:
-                    m["timestamp"] = _as_utc_string(m.get("timestamp"))
-
             last_msg_text = ""
-            if history:
-                last_msg_text = (history[-1].get("content") or "").strip()
+            if messages:
+                last_msg_text = (messages[-1].get("content") or "").strip()
                 if len(last_msg_text) > 140:
                     last_msg_text = last_msg_text[:137] + "..."
 
@@ -85,80 +200,86 @@ class ChatHistoryManager:
                 "session_id": session_id,
                 "created_at": created_at,                    # ✅ preserved
                 "last_updated": _iso_utc_now(),              # ✅ UTC with Z
-                "message_count": len(history),
+                "message_count": len(messages),
                 "last_message": last_msg_text,               # ✅ handy for admin preview
-                "messages": history
+                "messages": messages
             }
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=2, ensure_ascii=False)
+            with PERSISTENCE_LATENCY.time(operation="write_session"):
+                size_bytes = session_codec.dump(file_path, session_data, self.fmt)
+            session_data.pop("messages")
+            info = dict(session_data, size_bytes=size_bytes)
+            self.index.update(info)
+            self.feed.publish("session", dict(info, created=not indexed))
             return True
         except Exception as e:
-            print(f"❌ Error saving session history: {e}")
+            log.error("Error saving session history", extra=kv(session_id=session_id, error=str(e)))
             return False
     
-    def load_session_history(self, session_id: str) -> List[Dict]:
+    def load_session_history(self, session_id: str) -> List[Message]:
         try:
             file_path = self.get_session_file_path(session_id)
             if not os.path.exists(file_path):
                 return []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-
-            messages = session_data.get("messages", [])
-            # Normalize timestamps on load (helps old files)
-            for m in messages:
-                if "timestamp" in m:
-                    m["timestamp"] = _as_utc_string(m.get("timestamp"))
-            return messages
+            with PERSISTENCE_LATENCY.time(operation="load_session"):
+                session_data = session_codec.load(file_path)
+
+            return to_messages(session_data.get("messages", []))
         except Exception as e:
-            print(f"❌ Error loading session history: {e}")
+            log.error("Error loading session history", extra=kv(session_id=session_id, error=str(e)))
             return []
     
     def get_session_info(self, session_id: str) -> Optional[Dict]:
-        try:
-            file_path = self.get_session_file_path(session_id)
-            if not os.path.exists(file_path):
-                return None
-            with open(file_path, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-
-            return {
-                "session_id": session_data.get("session_id"),
-                "created_at": _as_utc_string(session_data.get("created_at")),
-                "last_updated": _as_utc_string(session_data.get("last_updated")),
-                "message_count": session_data.get("message_count", 0),
-                "last_message": session_data.get("last_message", "")
-            }
-        except Exception as e:
-            print(f"❌ Error getting session info: {e}")
-            return None
-    
+        info = self.index.get(session_id)
+        if info is None and os.path.exists(self.get_session_file_path(session_id)):
+            # Written by something that bypassed the index; pick it up
+            info = self._read_session_info(session_id)
+            if info:
+                self.index.update(info)
+        return info
+
+    def _read_session_info(self, session_id: str) -> Optional[Dict]:
+        return read_session_info(self.get_session_file_path(session_id), session_id)
+
+    def session_ids_on_disk(self) -> List[str]:
+        return [filename[8:-5] for filename in os.listdir(self.storage_dir)
+                if filename.startswith("session_") and filename.endswith(".json")]
+
+    def rebuild_index(self, infos: Optional[Iterable[Optional[Dict]]] = None) -> int:
+        """
+        Replace the metadata index with infos (default: re-read every session
+        file); returns the session count
+        """
+        if self._index is None or self._index.storage_dir != self.storage_dir:
+            self._index = SessionIndex(self.storage_dir)
+        if infos is None:
+            infos = (self._read_session_info(session_id) for session_id in self.session_ids_on_disk())
+        return self._index.rebuild(info for info in infos if info)
+
     def delete_session(self, session_id: str) -> bool:
         try:
             file_path = self.get_session_file_path(session_id)
-            if os.path.exists(file_path):
+            removed_file = os.path.exists(file_path)
+            if removed_file:
                 os.remove(file_path)
-                print(f"✅ Deleted session: {session_id}")
-                return True
-            return False
+            # Also clears index entries whose file went away some other way
+            removed_entry = self.index.remove(session_id)
+            if not (removed_file or removed_entry):
+                return False
+            self.feed.publish("deleted", {"session_id": session_id})
+            log.info("Deleted session", extra=kv(session_id=session_id, file=removed_file))
+            return True
         except Exception as e:
-            print(f"❌ Error deleting session: {e}")
+            log.error("Error deleting session", extra=kv(session_id=session_id, error=str(e)))
             return False
     
     def list_all_sessions(self) -> List[Dict]:
-        sessions = []
+        """Metadata of every session from the index, most recently updated first"""
         try:
-            for filename in os.listdir(self.storage_dir):
-                if filename.startswith("session_") and filename.endswith(".json"):
-                    session_id = filename[8:-5]
-                    info = self.get_session_info(session_id)
-                    if info:
-                        sessions.append(info)
-            sessions.sort(key=lambda x: x.get("last_updated", ""), reverse=True)
+            return self.index.all()
         except Exception as e:
-            print(f"❌ Error listing sessions: {e}")
-        return sessions
+            log.error("Error listing sessions", extra=kv(error=str(e)))
+            return []
     
     def cleanup_old_sessions(self, days_old: int = 30) -> int:
         from datetime import timedelta
@@ -171,12 +292,14 @@ class ChatHistoryManager:
                     mtime = datetime.fromtimestamp(os.path.getmtime(p), tz=timezone.utc)
                     if mtime < cutoff:
                         os.remove(p)
+                        self.index.remove(filename[8:-5])
+                        self.feed.publish("deleted", {"session_id": filename[8:-5]})
                         deleted += 1
-                        print(f"🗑️  Cleaned up old session: {filename}")
+                        log.debug("Cleaned up old session", extra=kv(file=filename))
             if deleted:
-                print(f"✅ Cleaned up {deleted} old sessions")
+                log.info("Cleaned up old sessions", extra=kv(deleted=deleted))
         except Exception as e:
-            print(f"❌ Error during cleanup: {e}")
+            log.error("Error during cleanup", extra=kv(error=str(e)))
         return deleted
 
 # Global instance
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from log_setup import get_logger, kv
+
+log = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for a remote dependency.
+
+    Outcomes of the last `window` calls are kept; once at least `min_calls`
+    are recorded and the share of failures (errors, or successes slower than
+    `slow_call_seconds`) reaches `failure_rate_threshold`, the circuit opens.
+    After `cooldown` seconds a single probe call is let through: success
+    closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, min_calls: int = 4,
+                 window: int = 20, slow_call_seconds: float = 10.0, cooldown: float = 30.0):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)   # (failed, latency_seconds)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now; in half-open only the single probe may"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def available(self) -> bool:
+        """Whether allow_request() would currently let a call through, without taking the probe"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self.cooldown
+            return not self._probe_in_flight
+
+    def record_success(self, latency: float):
+        # A call that answers but takes too long still hurts our users
+        if latency >= self.slow_call_seconds:
+            self.record_failure(latency)
+            return
+        with self._lock:
+            self._outcomes.append((False, latency))
+            if self.state == HALF_OPEN:
+                self._close()
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            self._outcomes.append((True, latency))
+            if self.state == HALF_OPEN:
+                self._open()
+            elif self.state == CLOSED and self._failure_rate() >= self.failure_rate_threshold \
+                    and len(self._outcomes) >= self.min_calls:
+                self._open()
+
+    def release_probe(self):
+        """Give back a probe slot whose call ended without a verdict on the dependency"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for failed, _ in self._outcomes if failed) / len(self._outcomes)
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.times_opened += 1
+        log.warning("Circuit open - failing fast", extra=kv(circuit=self.name, cooldown=self.cooldown))
+
+    def _close(self):
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._probe_in_flight = False
+        log.info("Circuit closed - dependency healthy again", extra=kv(circuit=self.name))
+
+    def status(self) -> Dict:
+        with self._lock:
+            latencies = [lat for _, lat in self._outcomes]
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "failure_rate": round(self._failure_rate(), 3),
+                "avg_latency_seconds": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "probe_in_flight": self._probe_in_flight,
+                "retry_in_seconds": round(retry_in, 1),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "config": {
+                    "failure_rate_threshold": self.failure_rate_threshold,
+                    "min_calls": self.min_calls,
+                    "window": self._outcomes.maxlen,
+                    "slow_call_seconds": self.slow_call_seconds,
+                    "cooldown_seconds": self.cooldown,
+                },
+            }
@@ -0,0 +1,61 @@
+import functools
+import gzip
+
+from flask import make_response, request
+
+try:
+    import brotli  # optional: br encoding (pip install brotli)
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # well below the maximum of 11, which is too slow for per-request use
+
+
+def _encoders():
+    encoders = {"gzip": lambda body: gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+    return encoders
+
+
+def negotiate(accept_encodings) -> str:
+    """The best encoding both sides support by the client's q-values, brotli on a tie; "" for none"""
+    encoders = _encoders()
+    best, best_q = "", 0
+    for name in ("br", "gzip"):
+        q = accept_encodings.quality(name) if name in encoders else 0
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress_response(response, min_bytes: int = 500):
+    """Compress a buffered response body for the current request's Accept-Encoding"""
+    response.vary.add("Accept-Encoding")
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    encoding = negotiate(request.accept_encodings)
+    if not encoding:
+        return response
+    response.set_data(_encoders()[encoding](body))
+    response.headers["Content-Encoding"] = encoding
+    # A strong ETag names the identity body; the compressed one is a different representation
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def compressed(min_bytes: int = 500):
+    """View decorator: negotiate gzip/brotli for the view's response"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            return compress_response(make_response(view(*args, **kwargs)), min_bytes)
+        return wrapper
+    return decorator
@@ -1,17 +1,50 @@
-import json
-
-# Load Conclave data once
-try:
-    with open("conclave_data.json", "r", encoding="utf-8") as file:
-        conclave_data = json.load(file)
-except Exception as e:
-    conclave_data = {}
-    print(f"❌ Error loading Conclave JSON: {e}")
+from knowledge_base import get_knowledge_base
+from log_setup import get_logger, kv
+
+log = get_logger("conclave")
+
+# Words that make a question about "the event we were just talking about"
+FOLLOW_UP_KEYWORDS = [
+    "timing", "time", "when", "schedule", "date",
+    "prizes", "awards", "rewards", "prize",
+    "format", "how", "process", "structure",
+    "participants", "who", "eligibility", "classes",
+    "registration", "deadline", "apply", "venue", "location",
+    "rules", "participate"
+]
+
+# List of all events from conclave_data.json
+CONTEXT_EVENTS = [
+    "plurilogues", "continuum", "quartet", "scriptorium", "sensorium",
+    "quest", "crossconnect", "biblioquest", "newstrack", "visual vocabulary",
+    "united nations reimagined"
+]
+
+
+def is_follow_up(query: str) -> bool:
+    query = query.lower()
+    return any(keyword in query for keyword in FOLLOW_UP_KEYWORDS)
+
+
+def context_event(response: str):
+    """The event an answer was about, remembered as context for follow-ups; None if none"""
+    response = response.lower()
+    for event in CONTEXT_EVENTS:
+        if event in response:
+            return event
+    # Fallback examples
+    if "annual sports meet" in response or "sports meet" in response:
+        return "annual sports meet"
+    return None
 
 
 def answer_conclave_query(query: str):
     query = query.lower().strip()
-    print(f"🎤 Conclave query: '{query}'")
+    kb = get_knowledge_base()
+    conclave_data = kb.conclave_data
+    if not conclave_data:
+        return None
+    log.debug("Conclave query", extra=kv(sampled=True, query=query))
 
     # Define keyword groups
     keywords = {
@@ -26,7 +59,7 @@ def answer_conclave_query(query: str):
     }
 
     # 🔍 Step 1: Try to find event match (direct, partial, fuzzy)
-    import difflib
+    import difflib  # deferred: only needed once there are events to match
     matched_event = None
     best_score = 0
     best_event = None
@@ -34,13 +67,13 @@ def answer_conclave_query(query: str):
         event_name = data.get("event_name", "").lower()
         # Direct match
         if key.lower() in query or event_name in query:
-            matched_event = data
+            matched_event = key
             break
         # Fuzzy match
         score = difflib.SequenceMatcher(None, query, event_name).ratio()
         if score > best_score:
             best_score = score
-            best_event = data
+            best_event = key
     # If no direct match, use best fuzzy match if score is reasonable
     if not matched_event and best_score > 0.6:
         matched_event = best_event
@@ -55,86 +88,21 @@ def answer_conclave_query(query: str):
             for word in query_words:
                 if len(word) > 2:
                     if word in event_words or word in key_words:
-                        matched_event = data
+                        matched_event = key
                         break
             if matched_event:
                 break
 
-    # Step 3: Return info if event matched
+    # Step 3: Return the pre-rendered answer if event matched
     if matched_event:
         # If query contains 'where' and event name, force venue response
         if "where" in query:
-            return format_specific_section(matched_event, "venue")
+            return kb.event_answers.get((matched_event, "venue"))
         for section, triggers in keywords.items():
             if any(word in query for word in triggers):
-                return format_specific_section(matched_event, section)
-        return format_full_summary(matched_event)  # default summary
+                return kb.event_answers.get((matched_event, section))
+        return kb.event_answers.get((matched_event, "summary"))  # default summary
 
     # Step 4: No match found
     return None
 
-
-def format_specific_section(data, section: str):
-    """Format response for a specific section of event data"""
-    if section == "rules":
-        return f"📖 Rules for {data['event_name']}:\n" + "\n".join(f"• {r}" for r in data.get("rules", []))
-
-    elif section == "prizes":
-        return f"🏆 Prizes for {data['event_name']}:\n" + "\n".join(f"• {p}" for p in data.get("prizes", []))
-
-    elif section == "timing":
-        duration = data.get("duration", "N/A")
-        return f"📅 {data['event_name']} is scheduled on {data['day']} at {data['timing']} (Duration: {duration})."
-
-    elif section == "venue":
-        venue = (
-            data.get("venue")
-            or data.get("location")
-            or data.get("place")
-            or data.get("hall")
-            or "venue details not available"
-        )
-        return f"📍 Venue for {data['event_name']}: {venue}"
-
-    elif section == "format":
-        return f"🎯 Format of {data['event_name']}:\n{data.get('format', 'N/A')}"
-
-    elif section == "description":
-        return f"ℹ️ About {data['event_name']}:\n{data.get('description', 'N/A')}"
-
-    elif section == "participants":
-        return f"👥 Eligible participants for {data['event_name']}: {data.get('class_range', 'N/A')}"
-
-    elif section == "registration":
-        deadline = data.get("registration_deadline")
-        if deadline:
-            return f"📝 Registration for {data['event_name']} closes on {deadline}."
-        return f"📝 Registration details for {data['event_name']} are not available. Please contact the coordinator."
-
-    return None
-
-
-def format_full_summary(data):
-    """Default: Return a summary of event"""
-    venue = (
-        data.get("venue")
-        or data.get("location")
-        or data.get("place")
-        or data.get("hall")
-        or "N/A"
-    )
-
-    lines = [
-        f"📌 {data['event_name']} (Classes {data.get('class_range', 'N/A')})",
-        f"🗓️ {data['day']} | ⏰ {data['timing']} | ⏳ Duration: {data.get('duration', 'N/A')}",
-        f"📍 Venue: {venue}",
-        "",
-        f"ℹ️ {data.get('description', 'N/A')}",
-        "",
-        "📖 Rules (sample):",
-    ] + [f"• {rule}" for rule in data.get("rules", [])[:3]] + [
-        "...",
-        "",
-        f"🏆 Awards: {', '.join(data.get('prizes', [])[:2])}..."
-    ]
-    return "\n".join(lines)
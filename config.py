@@ -12,13 +12,65 @@ class Config:
     # OpenRouter API Configuration
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
     
+    # AI backends: LLM_BACKENDS is a JSON list of OpenAI-compatible endpoints; without it
+    # a single OpenRouter backend is used
+    LLM_BACKENDS = os.getenv("LLM_BACKENDS")
+    OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-small-3.1-24b-instruct:free")
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+    LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", 0))  # seconds; 0 disables hedged requests
+    LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", 4))  # threads for hedged attempts; busy means unhedged
+    
+    # Precompiled knowledge base (`python knowledge_base.py build`); JSON is used if missing or stale
+    KB_ARTIFACT = os.getenv("KB_ARTIFACT", "knowledge_base.bin")
+    # Seconds the browser may reuse a school/conclave answer for the same question and data version
+    ANSWER_CACHE_SECONDS = int(os.getenv("ANSWER_CACHE_SECONDS", 3600))
+    
+    # Session file encoding: "json" (compact), "orjson" or "msgpack" (need `pip install orjson` / `msgpack`)
+    SESSION_FORMAT = os.getenv("SESSION_FORMAT", "json")
+    # Smallest /chat-history, /sessions or /metrics body worth gzip/brotli compressing
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 500))
+    
+    # Prompt assembly: knowledge-base snippets per AI call and hard prompt cap (characters)
+    PROMPT_TOP_K = int(os.getenv("PROMPT_TOP_K", 3))
+    PROMPT_MAX_CHARS = int(os.getenv("PROMPT_MAX_CHARS", 3000))
+    
+    # Rate limits as "capacity/seconds" token buckets, per session and across all sessions
+    AI_SESSION_RATE = os.getenv("AI_SESSION_RATE", "5/60")
+    AI_GLOBAL_RATE = os.getenv("AI_GLOBAL_RATE", "20/60")
+    LOCAL_SESSION_RATE = os.getenv("LOCAL_SESSION_RATE", "30/30")
+    LOCAL_GLOBAL_RATE = os.getenv("LOCAL_GLOBAL_RATE", "600/10")
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")  # optional shared backend
+    
+    # Seconds a request waits on an identical in-flight AI call before giving up
+    COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", 35))
+    
+    # Circuit breaker around the AI service
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", 0.5))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 4))
+    BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", 20))
+    BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", 10))
+    BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", 30))
+    
+    # Logging: level, "json" or "text" lines, and the share of per-request log lines kept
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+    
+    # Profiling of slow /ask requests: a sampled share, or any request sending X-Profile: <ADMIN_TOKEN>
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", 1000))
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")  # or "sample" for wall-clock stack samples
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_MAX_TRACES = int(os.getenv("PROFILE_MAX_TRACES", 50))
+    
     # Server Configuration
     PORT = int(os.getenv("PORT", 5000))
     
     @classmethod
     def validate(cls):
         """Validate that required configuration is present"""
-        if not cls.OPENROUTER_API_KEY:
-            print("⚠️  Warning: OPENROUTER_API_KEY not set. AI responses will not work.")
-            print("   Please set OPENROUTER_API_KEY environment variable.")
+        if not cls.OPENROUTER_API_KEY and not cls.LLM_BACKENDS:
+            from log_setup import get_logger
+            get_logger("config").warning("OPENROUTER_API_KEY not set; AI responses will not work")
         return True
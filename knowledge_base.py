@@ -0,0 +1,374 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import pickle
+import re
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from answers import iter_aliases, render_events, render_school, validate
+from config import Config
+from log_setup import get_logger, kv
+
+log = get_logger("knowledge_base")
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILES = ("school_data.json", "conclave_data.json")
+# Modules whose code decides what the artefact holds: the renderers and the index builder
+CODE_FILES = ("answers.py", "knowledge_base.py")
+
+# Artefact layout: magic, format version, sha256 of the source JSON files, sha256 of CODE_FILES,
+# sha256 and length of the pickled KnowledgeBase that follows. Bump ARTIFACT_VERSION whenever the
+# layout changes; a KnowledgeBase change is caught by the code hash.
+ARTIFACT_MAGIC = b"GYANKB\x00\x00"
+ARTIFACT_VERSION = 3
+_HEADER = struct.Struct("<8sH32s32s32sQ")
+
+# Words that carry no retrieval signal on their own
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "at",
+    "to", "for", "and", "or", "what", "whats", "where", "who", "when", "which",
+    "how", "about", "tell", "me", "please", "can", "you", "i", "it", "its",
+    "do", "does", "there", "this", "that", "with", "our", "my", "your", "by",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [t for t in re.findall(r"[a-z0-9]+", (text or "").lower()) if t not in STOPWORDS]
+
+
+def normalize(text):
+    text = text.lower().replace("-", "").replace(" ", "")
+    num_map = {
+        "first": "1", "1st": "1", "one": "1",
+        "second": "2", "2nd": "2", "two": "2",
+        "third": "3", "3rd": "3", "three": "3",
+        "fourth": "4", "4th": "4", "four": "4",
+        "fifth": "5", "5th": "5", "five": "5",
+        "sixth": "6", "6th": "6", "six": "6",
+        "seventh": "7", "7th": "7", "seven": "7",
+        "eighth": "8", "8th": "8", "eight": "8",
+        "ninth": "9", "9th": "9", "nine": "9",
+        "tenth": "10", "10th": "10", "ten": "10",
+        "eleventh": "11", "11th": "11", "eleven": "11",
+        "twelfth": "12", "12th": "12", "twelve": "12"
+    }
+    for word, digit in num_map.items():
+        if word in text:
+            text = text.replace(word, digit)
+    return text
+
+
+def _load_json(filename: str) -> Dict:
+    try:
+        with open(os.path.join(BASE_PATH, filename), "r", encoding="utf-8") as f:
+            text = f.read()
+        if not text.strip():
+            log.info("Data file is empty", extra=kv(file=filename))
+            return {}
+        data = json.loads(text)
+        return data if isinstance(data, dict) else {}
+    except Exception as e:
+        log.warning("Could not load data file", extra=kv(file=filename, error=str(e)))
+        return {}
+
+
+class KnowledgeBase:
+    """Flat snippet index over school_data.json and conclave_data.json for prompt grounding"""
+
+    def __init__(self, school_data: Dict, conclave_data: Dict, version: str = ""):
+        self.school_data = school_data
+        self.conclave_data = conclave_data
+        self.version = version
+        self.snippets: List[Dict] = []
+        self._index: Dict[str, List[int]] = {}
+        self._idf: Dict[str, float] = {}
+        # (key, lowercased, normalized) per school_data section, for get_school_info()
+        self.section_keys: Dict[str, List[Tuple[str, str, str]]] = {}
+        # (key, key lowercased, key normalized, name lowercased, name normalized) per conclave event
+        self.event_keys: List[Tuple[str, str, str, str, str]] = []
+        # Pre-rendered answers: (section, key) for school data, (event key, section) for conclave events
+        self.school_answers = render_school(school_data)
+        self.event_answers = render_events(conclave_data)
+        self.problems = validate(school_data, conclave_data)
+        self._build_snippets()
+        self._build_index()
+        self._build_keys()
+
+    def _add(self, title: str, text: str):
+        self.snippets.append({"title": title, "text": text})
+
+    def _build_snippets(self):
+        school = self.school_data
+
+        for key, value in school.get("locations", {}).items():
+            place = ", ".join(value) if isinstance(value, list) else value
+            self._add(key, f"The location of {key} is: {place}.")
+
+        for section in ("infrastructure", "co_curricular"):
+            for key, value in school.get(section, {}).items():
+                self._add(key, f"{key}: {value}")
+
+        mv = school.get("mission_vision", {})
+        if mv.get("vision"):
+            self._add("vision", f"Our vision: {mv['vision']}")
+        if mv.get("mission"):
+            self._add("mission", f"Our mission: {mv['mission']}")
+        if mv.get("core_values"):
+            self._add("core values", "Our core values: " + ", ".join(mv["core_values"]))
+
+        for key, value in school.get("staff", {}).items():
+            title = key.replace("_", " ").replace("-", " ")
+            if isinstance(value, list):
+                value = "; ".join(value)
+            elif isinstance(value, dict):
+                value = ", ".join(str(v) for v in value.values())
+            self._add(title, f"{title.capitalize()}: {value}")
+
+        for key, event in self.conclave_data.items():
+            if not isinstance(event, dict):
+                continue
+            name = event.get("event_name", key)
+            parts = [f"{name} ({event.get('class_range', 'N/A')})"]
+            if event.get("day") or event.get("timing"):
+                parts.append(f"on {event.get('day', 'TBA')} at {event.get('timing', 'TBA')}")
+            venue = event.get("venue") or event.get("location") or event.get("place") or event.get("hall")
+            if venue:
+                parts.append(f"venue {venue}")
+            if event.get("description"):
+                parts.append(f"- {event['description']}")
+            self._add(f"{key} {name}", " ".join(parts))
+
+    def _build_index(self):
+        doc_freq: Dict[str, int] = {}
+        for i, snippet in enumerate(self.snippets):
+            tokens = set(tokenize(snippet["title"])) | set(tokenize(snippet["text"]))
+            snippet["tokens"] = tokens
+            snippet["title_tokens"] = set(tokenize(snippet["title"]))
+            for token in tokens:
+                self._index.setdefault(token, []).append(i)
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+
+        total = max(len(self.snippets), 1)
+        self._idf = {t: math.log(1 + total / df) for t, df in doc_freq.items()}
+
+    def _build_keys(self):
+        for section in ("locations", "infrastructure", "co_curricular"):
+            self.section_keys[section] = [(key, key.lower(), normalize(key))
+                                          for key in self.school_data.get(section, {})]
+        for key, event in self.conclave_data.items():
+            if isinstance(event, dict) and event.get("event_name"):
+                name = event["event_name"]
+                self.event_keys.append((key, key.lower(), normalize(key), name.lower(), normalize(name)))
+        # school_data.json "aliases": {"canteen": "infrastructure/Cafeteria", "sports day": "conclave/quest"}
+        for alias, section, key in iter_aliases(self.school_data):
+            if section == "conclave":
+                if isinstance(self.conclave_data.get(key), dict):
+                    self.event_keys.append((key, alias.lower(), normalize(alias), alias.lower(), normalize(alias)))
+            elif key in self.school_data.get(section, {}):
+                self.section_keys[section].append((key, alias.lower(), normalize(alias)))
+
+    def search(self, query: str, top_k: int = 3) -> List[str]:
+        """Return the text of the top_k snippets most relevant to query"""
+        if top_k <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            idf = self._idf.get(token)
+            if idf is None:
+                continue
+            for i in self._index[token]:
+                # Title hits count double so "physics lab" beats any room that merely mentions a lab
+                weight = 2.0 if token in self.snippets[i]["title_tokens"] else 1.0
+                scores[i] = scores.get(i, 0.0) + idf * weight
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.snippets[i]["text"] for i, _ in ranked[:top_k]]
+
+
+def _files_digest(filenames) -> bytes:
+    """sha256 over the raw bytes of files in BASE_PATH; a missing file hashes as empty"""
+    digest = hashlib.sha256()
+    for filename in filenames:
+        try:
+            with open(os.path.join(BASE_PATH, filename), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def _source_digest() -> bytes:
+    return _files_digest(SOURCE_FILES)
+
+
+def _code_digest() -> bytes:
+    return _files_digest(CODE_FILES)
+
+
+def _build_from_json() -> KnowledgeBase:
+    # The version names the rendered answers, so a renderer change bumps it as a data change does
+    return KnowledgeBase(
+        _load_json("school_data.json"),
+        _load_json("conclave_data.json"),
+        version=hashlib.sha256(_source_digest() + _code_digest()).hexdigest()[:12],
+    )
+
+
+def artifact_path() -> str:
+    path = Config.KB_ARTIFACT
+    return path if os.path.isabs(path) else os.path.join(BASE_PATH, path)
+
+
+def build_artifact(path: Optional[str] = None) -> Tuple[KnowledgeBase, int]:
+    """Compile the JSON data into the binary artefact; returns the knowledge base and file size"""
+    path = path or artifact_path()
+    kb = _build_from_json()
+    payload = pickle.dumps(kb, protocol=pickle.HIGHEST_PROTOCOL)
+    header = _HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, _source_digest(), _code_digest(),
+                          hashlib.sha256(payload).digest(), len(payload))
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # workers starting together each write their own
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return kb, len(header) + len(payload)
+
+
+def load_artifact(path: Optional[str] = None) -> Optional[KnowledgeBase]:
+    """The precompiled knowledge base, or None if it is missing, stale or corrupt"""
+    path = path or artifact_path()
+    if not os.path.exists(path):
+        log.info("No knowledge base artefact", extra=kv(path=path))
+        return None
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) < _HEADER.size:
+                raise ValueError("truncated header")
+            magic, version, source, code, checksum, length = _HEADER.unpack_from(mm)
+            if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+                raise ValueError(f"format version {version}, expected {ARTIFACT_VERSION}")
+            if source != _source_digest():
+                raise ValueError("built from different data files")
+            if code != _code_digest():
+                raise ValueError("built by a different version of answers.py / knowledge_base.py")
+            payload = memoryview(mm)[_HEADER.size:_HEADER.size + length]
+            try:
+                if len(payload) != length or hashlib.sha256(payload).digest() != checksum:
+                    raise ValueError("checksum mismatch")
+                kb = pickle.loads(payload)
+            finally:
+                payload.release()
+        if not isinstance(kb, KnowledgeBase):
+            raise ValueError("unexpected payload")
+        return kb
+    except Exception as e:
+        log.warning("Ignoring knowledge base artefact", extra=kv(path=path, error=str(e)))
+        return None
+
+
+def load_or_build() -> KnowledgeBase:
+    """The artefact if it is current, else a fresh build that is also written back as the artefact"""
+    kb = load_artifact()
+    if kb is not None:
+        return kb
+    try:
+        kb, size = build_artifact()
+        log.info("Rebuilt knowledge base artefact", extra=kv(path=artifact_path(), size_bytes=size))
+        return kb
+    except OSError as e:
+        # A read-only deploy still serves, it just builds in memory on every start
+        log.warning("Could not write knowledge base artefact, using an in-memory build",
+                    extra=kv(path=artifact_path(), error=str(e)))
+        return _build_from_json()
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """
+    The shared knowledge base: the precompiled artefact when it matches the
+    data files and code, else rebuilt from the JSON (create_app() loads it
+    before serving)
+    """
+    global _knowledge_base
+    if _knowledge_base is None:
+        kb = load_or_build()
+        if kb.problems:
+            log.warning("Knowledge base data has problems; run `python knowledge_base.py validate`",
+                        extra=kv(count=len(kb.problems), first=kb.problems[:3]))
+        _knowledge_base = kb
+    return _knowledge_base
+
+
+def get_school_data() -> Dict:
+    """school_data.json, read once per process"""
+    return get_knowledge_base().school_data
+
+
+def get_conclave_data() -> Dict:
+    """conclave_data.json, read once per process; {} if the file is empty or invalid"""
+    return get_knowledge_base().conclave_data
+
+
+def best_effort_answer(query: str) -> str:
+    """Local-only answer used when the AI tier is unavailable or over budget"""
+    snippets = get_knowledge_base().search(query, 2)
+    if snippets:
+        return "Here's what I found in the school information:\n" + "\n".join(snippets)
+    return ("I'm getting a lot of questions right now and couldn't find this in the school information. "
+            "Please try again in a minute.")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python knowledge_base.py", description="GYAN knowledge base tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="compile the JSON data files into the binary artefact")
+    build.add_argument("-o", "--output", help=f"artefact path (default: KB_ARTIFACT, {Config.KB_ARTIFACT})")
+    render = sub.add_parser("render", help="render every answer the local tiers can give")
+    render.add_argument("-o", "--output", help="write the answers as JSON instead of printing them")
+    sub.add_parser("validate", help="list data entries with missing fields; exits 1 if there are any")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        path = args.output or artifact_path()
+        kb, size = build_artifact(path)
+        print(f"✅ Wrote {path}: {len(kb.snippets)} snippets, {len(kb.school_answers) + len(kb.event_answers)} "
+              f"answers, {size} bytes (data version {kb.version})")
+        if kb.problems:
+            print(f"⚠️ {len(kb.problems)} data problems; run `python knowledge_base.py validate`")
+    elif args.command == "render":
+        kb = _build_from_json()
+        rendered = [{"source": "school", "entity": section, "key": key, "answer": answer}
+                    for (section, key), answer in kb.school_answers.items()]
+        rendered += [{"source": "conclave", "entity": key, "key": section, "answer": answer}
+                     for (key, section), answer in kb.event_answers.items()]
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"version": kb.version, "answers": rendered}, f, indent=2, ensure_ascii=False)
+            print(f"✅ Wrote {len(rendered)} answers to {args.output}")
+        else:
+            for item in rendered:
+                print(f"[{item['source']}] {item['entity']} / {item['key']}\n{item['answer']}\n")
+    elif args.command == "validate":
+        kb = _build_from_json()
+        for problem in kb.problems:
+            field = f".{problem['field']}" if problem["field"] else ""
+            print(f"❌ {problem['source']}: {problem['entity']}{field}: {problem['message']}")
+        total = len(kb.school_answers) + len(kb.event_answers)
+        print(f"{len(kb.problems)} problems, {total} answers rendered (data version {kb.version})")
+        sys.exit(1 if kb.problems else 0)
+
+
+if __name__ == "__main__":
+    # Run through the imported module so the pickle references knowledge_base.KnowledgeBase, not __main__
+    from knowledge_base import main as _main
+    _main()
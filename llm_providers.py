@@ -0,0 +1,337 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from circuit_breaker import CircuitBreaker
+from log_setup import get_logger, kv
+from metrics import UPSTREAM_LATENCY
+
+log = get_logger("llm")
+
+
+class AIServiceError(Exception):
+    """AI call failed; str(error) is the apology shown to the user"""
+
+    def __init__(self, message, counts_as_failure=True):
+        super().__init__(message)
+        self.counts_as_failure = counts_as_failure
+
+
+class CircuitOpenError(AIServiceError):
+    """No AI backend is currently considered healthy, so none was called"""
+
+
+class LLMProvider:
+    """One chat-completion endpoint; subclasses implement chat()"""
+
+    def __init__(self, name: str, model: str):
+        self.name = name
+        self.model = model
+        # Called as on_call(provider, messages, status, answer) after every HTTP round trip
+        self.on_call: Optional[Callable] = None
+
+    def chat(self, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 150,
+             timeout: float = 30) -> str:
+        raise NotImplementedError
+
+    def _report(self, messages, status, answer=None):
+        if self.on_call:
+            self.on_call(self, messages, status, answer)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Any server speaking the OpenAI /chat/completions protocol: OpenRouter,
+    OpenAI itself, vLLM, or a local llama.cpp / Ollama server.
+    """
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: Optional[str] = None,
+                 headers: Optional[Dict] = None):
+        super().__init__(name, model)
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.headers.update(headers or {})
+
+    def chat(self, messages, temperature=0.7, max_tokens=150, timeout=30):
+        import requests  # deferred: the HTTP stack is only needed once the AI tier is reached
+
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        try:
+            response = requests.post(self.url, json=data, headers=self.headers, timeout=timeout)
+            resp_json = response.json()
+        except requests.exceptions.Timeout:
+            self._report(messages, "timeout")
+            raise AIServiceError("Sorry, the AI service is taking too long to respond. Please try again.")
+        except requests.exceptions.RequestException as e:
+            log.warning("AI request error", extra=kv(backend=self.name, error=str(e)))
+            self._report(messages, "connection_error")
+            raise AIServiceError("Sorry, I couldn't connect to the AI service. Please check your internet connection.")
+        except Exception as e:
+            log.warning("AI API did not return JSON", extra=kv(backend=self.name, error=str(e)))
+            self._report(messages, "bad_response")
+            raise AIServiceError("Sorry, I couldn't get an answer from the AI service.")
+
+        error = resp_json.get("error") if isinstance(resp_json, dict) else None
+        error = error if isinstance(error, dict) else {}
+
+        # Handle rate limit error
+        if response.status_code == 429 or error.get("code") == 429:
+            self._report(messages, 429)
+            raise AIServiceError("Sorry, the AI service is temporarily busy. Please try again later.")
+
+        if response.status_code == 200:
+            answer = (resp_json.get("choices") or [{}])[0].get("message", {}).get("content", "")
+            self._report(messages, 200, answer)
+            return answer
+
+        error_msg = error.get("message", "Unknown error")
+        log.warning("AI API error", extra=kv(backend=self.name, status=response.status_code, error=error_msg))
+        self._report(messages, response.status_code)
+        # Only server-side errors say anything about the backend's health
+        raise AIServiceError(f"Sorry, the AI service returned an error: {error_msg}",
+                             counts_as_failure=response.status_code >= 500)
+
+
+class Backend:
+    """A provider plus the health and latency statistics used to route to it"""
+
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker, alpha: float = 0.3,
+                 prior_latency: float = 30.0):
+        self.provider = provider
+        self.breaker = breaker
+        self.alpha = alpha
+        # Assumed latency until a call succeeds: the worst case, the request timeout
+        self.prior_latency = prior_latency
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def observe(self, latency: float, failed: bool):
+        with self._lock:
+            self.calls += 1
+            self.errors += int(failed)
+            if not failed:
+                # Failed calls say little about how fast a good answer is
+                self.ewma_latency = latency if self.ewma_latency is None else \
+                    self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+            self.ewma_error_rate = self.alpha * float(failed) + (1 - self.alpha) * self.ewma_error_rate
+
+    def score(self) -> float:
+        """
+        Expected cost of a call. Untried backends score 0 so they get
+        measured; ones that have been tried but never answered are costed at
+        the prior latency, so they rank behind every backend that works.
+        """
+        if not self.calls:
+            return 0.0
+        latency = self.prior_latency if self.ewma_latency is None else self.ewma_latency
+        return latency * (1 + 4 * self.ewma_error_rate)
+
+    def status(self) -> Dict:
+        return {
+            "name": self.name,
+            "model": self.provider.model,
+            "ewma_latency_seconds": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "ewma_error_rate": round(self.ewma_error_rate, 3),
+            "calls": self.calls,
+            "errors": self.errors,
+            "breaker": self.breaker.status(),
+        }
+
+
+class ProviderRouter:
+    """
+    Send each chat to the fastest healthy backend.
+
+    Backends are ranked by EWMA latency weighted by their recent error rate;
+    ones whose breaker is open are skipped. On failure the next backend is
+    tried. With hedge_after set, a second backend is started if the first
+    has not answered within that many seconds and the first answer wins.
+
+    Hedged attempts run on a pool of hedge_workers threads and the caller
+    waits for the first answer. An attempt only ever takes a free worker and
+    never queues: without one the call runs on the calling thread, unhedged.
+    A losing attempt cannot be interrupted mid-request, so it keeps its
+    worker until it finishes or hits the timeout.
+    """
+
+    def __init__(self, backends: List[Backend], hedge_after: Optional[float] = None,
+                 temperature: float = 0.7, max_tokens: int = 150, timeout: float = 30,
+                 hedge_workers: int = 4):
+        self.backends = backends
+        self.hedge_after = hedge_after or None
+        self.params = {"temperature": temperature, "max_tokens": max_tokens, "timeout": timeout}
+        self.hedges_started = 0
+        self.hedges_skipped = 0
+        self._executor = None
+        if self.hedge_after and len(backends) > 1 and hedge_workers > 0:
+            self._executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="llm-hedge")
+            self._workers = threading.BoundedSemaphore(hedge_workers)
+
+    def candidates(self) -> List[Backend]:
+        return sorted((b for b in self.backends if b.breaker.available()), key=lambda b: b.score())
+
+    def chat(self, messages: List[Dict]) -> str:
+        if not self.backends:
+            raise AIServiceError("Sorry, AI service is not configured. Please set OPENROUTER_API_KEY environment variable.",
+                                 counts_as_failure=False)
+        candidates = self.candidates()
+        if not candidates:
+            raise CircuitOpenError("Sorry, the AI service is temporarily unavailable. Please try again later.")
+        if self._executor and len(candidates) > 1:
+            primary = self._submit(candidates[0], messages)
+            if primary is not None:
+                return self._hedged(primary, candidates[1:], messages)
+            self.hedges_skipped += 1
+
+        last_error: Optional[AIServiceError] = None
+        for backend in candidates:
+            try:
+                return self._attempt(backend, messages)
+            except AIServiceError as e:
+                last_error = e
+        raise last_error
+
+    def _attempt(self, backend: Backend, messages: List[Dict]) -> str:
+        if not backend.breaker.allow_request():
+            raise CircuitOpenError("Sorry, the AI service is temporarily unavailable. Please try again later.")
+        started = time.monotonic()
+        try:
+            answer = backend.provider.chat(messages, **self.params)
+        except AIServiceError as e:
+            latency = time.monotonic() - started
+            backend.observe(latency, e.counts_as_failure)
+            if e.counts_as_failure:
+                backend.breaker.record_failure(latency)
+            else:
+                backend.breaker.release_probe()
+            raise
+        except Exception:
+            latency = time.monotonic() - started
+            backend.observe(latency, True)
+            backend.breaker.record_failure(latency)
+            raise
+        latency = time.monotonic() - started
+        UPSTREAM_LATENCY.observe(latency, backend=backend.name)
+        backend.observe(latency, False)
+        backend.breaker.record_success(latency)
+        return answer
+
+    def _submit(self, backend: Backend, messages: List[Dict]):
+        """Start an attempt on a free pool worker; None if all are busy"""
+        if not self._workers.acquire(blocking=False):
+            return None
+        try:
+            future = self._executor.submit(self._attempt, backend, messages)
+        except RuntimeError:  # pool shut down
+            self._workers.release()
+            return None
+        future.add_done_callback(lambda _: self._workers.release())
+        return future
+
+    def _hedged(self, primary, queue: List[Backend], messages: List[Dict]) -> str:
+        queue = list(queue)
+        pending = {primary}
+        last_error: Optional[BaseException] = None
+        skipped = False
+        while pending:
+            done, pending = wait(pending, timeout=self.hedge_after if queue else None,
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow first answer: race the next-best backend against it, if a worker is free
+                hedge = self._submit(queue[0], messages)
+                if hedge is None:
+                    # Keep the backend queued; it is still the fallback if the first attempt fails.
+                    # The next wait retries the hedge, but a request counts as skipped once
+                    self.hedges_skipped += not skipped
+                    skipped = True
+                else:
+                    queue.pop(0)
+                    self.hedges_started += 1
+                    pending.add(hedge)
+                continue
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            while queue and not pending:
+                # Everything started so far failed: fail over, on this thread if the pool is busy
+                backend = queue.pop(0)
+                future = self._submit(backend, messages)
+                if future is not None:
+                    pending.add(future)
+                    continue
+                try:
+                    return self._attempt(backend, messages)
+                except Exception as e:
+                    last_error = e
+        if isinstance(last_error, AIServiceError):
+            raise last_error
+        raise AIServiceError("Sorry, I couldn't get an answer from the AI service.")
+
+    def status(self) -> Dict:
+        return {
+            "hedge_after_seconds": self.hedge_after,
+            "hedges_started": self.hedges_started,
+            "hedges_skipped": self.hedges_skipped,
+            "backends": [b.status() for b in sorted(self.backends, key=lambda b: b.score())],
+        }
+
+
+def load_backend_configs(raw: Optional[str], openrouter_key: Optional[str], openrouter_model: str) -> List[Dict]:
+    """
+    Backend definitions from LLM_BACKENDS (a JSON list), else a single
+    OpenRouter backend when OPENROUTER_API_KEY is set. Entries look like
+    {"name": "local", "base_url": "http://localhost:8080/v1", "model": "llama",
+     "api_key_env": "LOCAL_LLM_KEY", "headers": {}}.
+    """
+    if raw:
+        try:
+            configs = json.loads(raw)
+            if isinstance(configs, list):
+                return configs
+            log.warning("LLM_BACKENDS must be a JSON list, ignoring it")
+        except ValueError as e:
+            log.warning("Could not parse LLM_BACKENDS", extra=kv(error=str(e)))
+    if not openrouter_key:
+        return []
+    return [{
+        "name": "openrouter",
+        "base_url": "https://openrouter.ai/api/v1",
+        "model": openrouter_model,
+        "api_key": openrouter_key,
+        "headers": {"Referer": "https://gyan-chatbot.onrender.com"},  # 👈 required by OpenRouter
+    }]
+
+
+def build_router(configs: List[Dict], breaker_settings: Dict, hedge_after: Optional[float] = None,
+                 on_call: Optional[Callable] = None, **params) -> ProviderRouter:
+    backends = []
+    for i, cfg in enumerate(configs):
+        name = cfg.get("name") or f"backend{i + 1}"
+        if not cfg.get("base_url") or not cfg.get("model"):
+            log.warning("LLM backend needs base_url and model, skipping it", extra=kv(backend=name))
+            continue
+        api_key = cfg.get("api_key") or (os.getenv(cfg["api_key_env"]) if cfg.get("api_key_env") else None)
+        provider = OpenAICompatibleProvider(name, cfg["base_url"], cfg["model"], api_key, cfg.get("headers"))
+        provider.on_call = on_call
+        backends.append(Backend(provider, CircuitBreaker(name, **breaker_settings),
+                                prior_latency=params.get("timeout", 30)))
+    return ProviderRouter(backends, hedge_after=hedge_after, **params)
@@ -6,8 +6,15 @@ Command-line utility to manage chat sessions
 import os
 import sys
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+from log_setup import setup_logging
+
+# Plain log lines on the console; this must run before other modules grab a logger
+setup_logging(fmt="text", sample_rate=1.0)
+
 from chat_history import chat_manager
+import query_mining
+import session_bulk
 
 def print_header():
     print("=" * 60)
@@ -30,6 +37,8 @@ def list_sessions():
             print(f"   Created: {format_date(session.get('created_at'))}")
             print(f"   Last Updated: {format_date(session.get('last_updated'))}")
             print(f"   Messages: {session.get('message_count', 0)}")
+            if session.get('size_bytes') is not None:
+                print(f"   Size: {format_size(session['size_bytes'])}")
             
             if session.get('note'):
                 print(f"   Note: {session['note']}")
@@ -52,9 +61,9 @@ def view_session(session_id):
         print("-" * 40)
         
         for i, message in enumerate(history, 1):
-            timestamp = format_date(message.get('timestamp'))
-            role = message.get('role', 'unknown')
-            content = message.get('content', '')
+            timestamp = format_date(message.ts)
+            role = message.role
+            content = message.content
             
             print(f"\n{i}. [{timestamp}] {role.upper()}:")
             print(f"   {content}")
@@ -75,17 +84,30 @@ def delete_session(session_id):
     except Exception as e:
         print(f"❌ Error deleting session: {e}")
 
-def cleanup_old_sessions(days=30):
+def cleanup_old_sessions(days=30, dry_run=False, workers=None):
     """Clean up old sessions"""
-    print(f"\n🧹 Cleaning up sessions older than {days} days...")
+    print(f"\n🧹 Cleaning up sessions older than {days} days{' (dry run)' if dry_run else ''}...")
     
     try:
-        deleted_count = chat_manager.cleanup_old_sessions(days)
-        print(f"✅ Cleaned up {deleted_count} old sessions.")
+        result = session_bulk.cleanup(chat_manager, days, dry_run=dry_run, workers=workers)
+        verb = "Would clean up" if dry_run else "Cleaned up"
+        print(f"✅ {verb} {result['deleted']} of {result['scanned']} sessions ({format_size(result['bytes'])}).")
     
     except Exception as e:
         print(f"❌ Error during cleanup: {e}")
 
+def export_sessions(path, fmt="jsonl", dry_run=False, workers=None):
+    """Export every message of every session to one file"""
+    print(f"\n📦 Exporting sessions to {path} ({fmt}){' (dry run)' if dry_run else ''}...")
+    
+    try:
+        result = session_bulk.export(chat_manager, path, fmt=fmt, dry_run=dry_run, workers=workers)
+        verb = "Would export" if dry_run else "Exported"
+        print(f"✅ {verb} {result['rows']} messages from {result['sessions']} sessions.")
+    
+    except Exception as e:
+        print(f"❌ Error during export: {e}")
+
 def show_stats():
     """Show session statistics"""
     print("\n📊 Session Statistics")
@@ -95,9 +117,11 @@ def show_stats():
         
         total_sessions = len(sessions)
         total_messages = sum(session.get('message_count', 0) for session in sessions)
+        total_bytes = sum(session.get('size_bytes') or 0 for session in sessions)
         
         print(f"Total Sessions: {total_sessions}")
         print(f"Total Messages: {total_messages}")
+        print(f"Total Size: {format_size(total_bytes)}")
         
         if sessions:
             # Find oldest and newest sessions
@@ -111,10 +135,107 @@ def show_stats():
     except Exception as e:
         print(f"❌ Error getting statistics: {e}")
 
+def reindex_sessions(dry_run=False, workers=None):
+    """Rebuild the session metadata index from the session files"""
+    print(f"\n🔁 Rebuilding session index{' (dry run)' if dry_run else ''}...")
+    
+    try:
+        result = session_bulk.reindex(chat_manager, dry_run=dry_run, workers=workers)
+        print(f"   Missing from index: {result['missing']} | No longer on disk: {result['orphaned']} | "
+              f"Out of date: {result['stale']}")
+        if dry_run:
+            print(f"✅ Checked {result['sessions']} sessions; index left unchanged.")
+        else:
+            print(f"✅ Indexed {result['sessions']} sessions.")
+    
+    except Exception as e:
+        print(f"❌ Error rebuilding index: {e}")
+
+def report_misses(top=20, min_count=2, json_path=None, workers=None):
+    """Rank the questions that still fall through to the AI, with suggested data additions"""
+    print("\n🔍 Mining questions answered by the AI tier...")
+    
+    try:
+        report = query_mining.mine(chat_manager, min_count=min_count, workers=workers)
+        tiers = report["tiers"]
+        print(f"   {report['questions']} questions in {report['sessions']} sessions | " +
+              " | ".join(f"{tier}: {tiers.get(tier, 0)}" for tier in query_mining.LOCAL_TIERS + query_mining.AI_TIERS))
+        print(f"   AI-tier questions the current data now answers locally: {report['now_local']}")
+        print(f"   Still missing locally: {report['misses']} "
+              f"({len(report['clusters'])} clusters, each asked at least {min_count} times)")
+        if report["orphan_follow_ups"]:
+            print(f"   Follow-ups with no earlier topic to credit (skipped): {report['orphan_follow_ups']}")
+        
+        for rank, group in enumerate(report["clusters"][:top], 1):
+            print(f"\n{rank:3}. ×{group['count']} in {group['sessions']} sessions"
+                  + (f" ({group['follow_ups']} follow-ups)" if group["follow_ups"] else ""))
+            print("     e.g. " + ", ".join(f'"{q}"' for q in group["examples"]))
+            suggestion = group["suggestion"]
+            if suggestion["action"] == "alias":
+                print(f'     → alias "{suggestion["alias"]}": "{suggestion["target"]}" in school_data.json "aliases"')
+            else:
+                print(f'     → new entry for "{suggestion["key"]}" in school_data.json or conclave_data.json')
+        
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"\n✅ Full report written to {json_path}")
+    
+    except Exception as e:
+        print(f"❌ Error mining sessions: {e}")
+
+def parse_options(args):
+    """Split positional arguments from --dry-run, --workers N, --format F, --top N, --min-count N and --json F"""
+    positional, options = [], {"dry_run": False, "workers": None, "format": "jsonl",
+                               "top": 20, "min_count": 2, "json": None}
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--dry-run":
+            options["dry_run"] = True
+        elif arg == "--workers" and args:
+            options["workers"] = int(args.pop(0))
+        elif arg == "--format" and args:
+            options["format"] = args.pop(0)
+        elif arg in ("--top", "--min-count") and args:
+            options[arg[2:].replace("-", "_")] = int(args.pop(0))
+        elif arg == "--json" and args:
+            options["json"] = args.pop(0)
+        else:
+            positional.append(arg)
+    return positional, options
+
+def run_bulk_command(command, args):
+    """cleanup / export / reindex / misses with their options; returns False for a usage error"""
+    positional, options = parse_options(args)
+    if command == "cleanup":
+        days = int(positional[0]) if positional else 30
+        cleanup_old_sessions(days, dry_run=options["dry_run"], workers=options["workers"])
+    elif command == "export" and positional:
+        export_sessions(positional[0], fmt=options["format"], dry_run=options["dry_run"], workers=options["workers"])
+    elif command == "reindex":
+        reindex_sessions(dry_run=options["dry_run"], workers=options["workers"])
+    elif command == "misses":
+        report_misses(top=options["top"], min_count=options["min_count"], json_path=options["json"],
+                      workers=options["workers"])
+    else:
+        return False
+    return True
+
+def format_size(size):
+    """Format a byte count for display"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
 def format_date(date_string):
-    """Format date string for display"""
+    """Format an ISO date string or epoch seconds for display"""
     if not date_string:
         return "N/A"
+    if isinstance(date_string, int):
+        return datetime.fromtimestamp(date_string, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
     
     try:
         date = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
@@ -130,12 +251,21 @@ def show_help():
     print("  delete <session_id>     - Delete a specific session")
     print("  cleanup [days]          - Clean up old sessions (default: 30 days)")
     print("  stats                   - Show session statistics")
+    print("  reindex                 - Rebuild the session metadata index from the files")
+    print("  export <file>           - Export all messages to one file (--format jsonl|parquet)")
+    print("  misses                  - Rank questions the AI answered that local data could cover")
+    print("                            (--top N, --min-count N, --workers N, --json FILE for all of it)")
+    print("\n  cleanup, reindex and export run on a worker pool and accept:")
+    print("    --dry-run             - Report what would change without changing anything")
+    print("    --workers N           - Pool size (default: number of CPUs)")
     print("  help                    - Show this help message")
     print("  exit                    - Exit the program")
     print("\nExamples:")
     print("  python manage_sessions.py list")
     print("  python manage_sessions.py view abc123")
-    print("  python manage_sessions.py cleanup 7")
+    print("  python manage_sessions.py cleanup 7 --dry-run")
+    print("  python manage_sessions.py export sessions.jsonl --workers 8")
+    print("  python manage_sessions.py misses --top 10 --json misses.json")
 
 def main():
     print_header()
@@ -150,9 +280,8 @@ def main():
             view_session(sys.argv[2])
         elif command == "delete" and len(sys.argv) > 2:
             delete_session(sys.argv[2])
-        elif command == "cleanup":
-            days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-            cleanup_old_sessions(days)
+        elif command in ("cleanup", "export", "reindex", "misses") and run_bulk_command(command, sys.argv[2:]):
+            pass
         elif command == "stats":
             show_stats()
         elif command == "help":
@@ -167,7 +296,8 @@ def main():
         
         while True:
             try:
-                command = input("\n🔧 Enter command: ").strip().lower()
+                raw_command = input("\n🔧 Enter command: ").strip()
+                command = raw_command.lower()
                 
                 if command == "exit" or command == "quit":
                     print("👋 Goodbye!")
@@ -182,10 +312,10 @@ def main():
                 elif command.startswith("delete "):
                     session_id = command[7:].strip()
                     delete_session(session_id)
-                elif command.startswith("cleanup"):
-                    parts = command.split()
-                    days = int(parts[1]) if len(parts) > 1 else 30
-                    cleanup_old_sessions(days)
+                elif command.split()[:1] in (["cleanup"], ["export"], ["reindex"], ["misses"]):
+                    parts = raw_command.split()  # keep the case of export paths
+                    if not run_bulk_command(parts[0].lower(), parts[1:]):
+                        print("❌ Missing arguments. Type 'help' for available commands.")
                 elif command == "stats":
                     show_stats()
                 elif command == "":
@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans a cached local answer (~1ms) up to an LLM timeout (30s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_str(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}   # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            row = self._values.get(self._key(labels))
+            return sum(row[:-1]) if row else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(row)) for k, row in self._values.items())
+        lines = self.header()
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, ('le', f'{bound:g}'))} {cumulative}")
+            cumulative += row[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {row[-1]:g}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ASK_LATENCY = REGISTRY.register(Histogram(
+    "gyan_ask_latency_seconds", "End-to-end /ask handling time by answering source", ["source"]))
+TIER_LATENCY = REGISTRY.register(Histogram(
+    "gyan_tier_latency_seconds", "Time spent in each answer tier, hit or miss", ["tier"]))
+ANSWERS = REGISTRY.register(Counter(
+    "gyan_answers_total", "Answers served by source (school, conclave, ai, degraded, rate_limited, error)", ["source"]))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "gyan_cache_requests_total", "Cache and coalescing lookups by result (hit or miss)", ["cache", "result"]))
+PERSISTENCE_LATENCY = REGISTRY.register(Histogram(
+    "gyan_persistence_seconds", "Chat history storage operation time", ["operation"]))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    "gyan_upstream_responses_total", "AI backend responses by status code or failure kind", ["backend", "status"]))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "gyan_upstream_latency_seconds", "AI backend call time", ["backend"]))
+PROMPT_CHARS = REGISTRY.register(Histogram(
+    "gyan_ai_prompt_chars", "Characters sent to the AI per call", [],
+    buckets=(250, 500, 1000, 2000, 3000, 4000, 8000)))
+RESPONSE_CHARS = REGISTRY.register(Histogram(
+    "gyan_ai_response_chars", "Characters of each answer the AI returned", [],
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000)))
+BREAKER_OPEN = REGISTRY.register(Gauge(
+    "gyan_circuit_open", "1 while the AI backend's circuit breaker is not closed", ["backend"]))
+LIMITER_TOKENS = REGISTRY.register(Gauge(
+    "gyan_rate_limit_global_tokens", "Tokens left in each global rate-limit bucket", ["limiter"]))
+
+
+def observe_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
@@ -0,0 +1,203 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+from log_setup import get_logger, kv
+
+log = get_logger("profiling")
+
+# Only one cProfile can be active per process on newer Pythons, so concurrent requests fall back to sampling
+_cprofile_lock = threading.Lock()
+
+TRACE_NAME = re.compile(r"^trace_[\w.-]+\.(prof|folded|json)$")
+
+
+class WallClockSampler:
+    """Periodically records the stack of one thread; output is in collapsed (flamegraph) format"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+class RequestProfiler:
+    """
+    Profile a sample of /ask requests and keep traces of the slow ones.
+
+    A request is profiled when it wins the PROFILE_SAMPLE_RATE draw or
+    carries `X-Profile: <ADMIN_TOKEN>`. Sampled requests are kept only if
+    slower than PROFILE_THRESHOLD_MS; admin-requested ones are always kept.
+    Each trace gets a JSON sidecar with the answering tier and session size.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, threshold_ms: float = 1000.0,
+                 max_traces: int = 50, mode: str = "cprofile", admin_token: Optional[str] = None,
+                 paths=("/ask",)):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.threshold = threshold_ms / 1000.0
+        self.max_traces = max_traces
+        self.mode = mode
+        self.admin_token = admin_token
+        self.paths = set(paths)
+        self.captured = 0
+
+    def install(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+
+    def _wanted(self) -> Optional[str]:
+        if request.path not in self.paths:
+            return None
+        header = request.headers.get("X-Profile")
+        if header and self.admin_token and header == self.admin_token:
+            return "admin"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def _start(self):
+        reason = self._wanted()
+        if not reason:
+            return
+        g.profile_reason = reason
+        g.profile_started = time.perf_counter()
+        if self.mode == "cprofile" and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g.profiler = profiler
+                return
+            except ValueError:
+                _cprofile_lock.release()
+        sampler = WallClockSampler(threading.get_ident())
+        sampler.start()
+        g.profiler = sampler
+
+    def _finish(self, response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        elapsed = time.perf_counter() - g.profile_started
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            _cprofile_lock.release()
+        else:
+            profiler.stop()
+
+        if g.profile_reason == "admin" or elapsed >= self.threshold:
+            try:
+                self._write(profiler, elapsed)
+            except Exception as e:
+                log.warning("Could not write profile trace", extra=kv(error=str(e)))
+        return response
+
+    def _abandon(self, exc=None):
+        # after_request is skipped on unhandled errors; never leave a profiler running
+        profiler = g.pop("profiler", None)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            _cprofile_lock.release()
+        elif profiler is not None:
+            profiler.stop()
+
+    def _write(self, profiler, elapsed: float):
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        tier = g.get("answer_source", "unknown")
+        name = f"trace_{stamp}_{int(elapsed * 1000)}ms_{tier}_{random.randrange(16 ** 4):04x}"
+        if isinstance(profiler, cProfile.Profile):
+            trace_file = f"{name}.prof"
+            profiler.dump_stats(os.path.join(self.directory, trace_file))
+        else:
+            trace_file = f"{name}.folded"
+            with open(os.path.join(self.directory, trace_file), "w", encoding="utf-8") as f:
+                f.write(profiler.folded())
+
+        meta = {
+            "trace": trace_file,
+            "captured_at": stamp,
+            "path": request.path,
+            "latency_ms": round(elapsed * 1000, 1),
+            "tier": tier,
+            "session_size": g.get("session_size"),
+            "reason": g.profile_reason,
+            "format": "cprofile" if trace_file.endswith(".prof") else "collapsed-stacks",
+        }
+        with open(os.path.join(self.directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self.captured += 1
+        log.info("Captured slow request profile", extra=kv(**meta))
+        self._rotate()
+
+    def _rotate(self):
+        traces = sorted(self.list_traces(), key=lambda t: t["captured_at"])
+        for old in traces[:max(0, len(traces) - self.max_traces)]:
+            for filename in (old["trace"], old["meta_file"]):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+    def list_traces(self) -> List[Dict]:
+        traces = []
+        if not os.path.isdir(self.directory):
+            return traces
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("trace_") and filename.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                    meta = json.load(f)
+                meta["meta_file"] = filename
+                meta["size_bytes"] = os.path.getsize(os.path.join(self.directory, meta["trace"]))
+                traces.append(meta)
+            except (OSError, ValueError, KeyError):
+                continue
+        traces.sort(key=lambda t: t["captured_at"], reverse=True)
+        return traces
+
+    def status(self) -> Dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "threshold_ms": self.threshold * 1000,
+            "mode": self.mode,
+            "max_traces": self.max_traces,
+            "admin_header_enabled": bool(self.admin_token),
+            "captured": self.captured,
+        }
@@ -0,0 +1,64 @@
+from typing import Dict, List, Optional
+
+from config import Config
+from knowledge_base import get_knowledge_base
+
+SYSTEM_PROMPT = """You are GYAN, a helpful school information chatbot for B.K. Birla Public School.
+Use the school facts below when they are relevant and do not invent school details.
+Follow up on earlier messages when the user asks "what about X". Keep answers under 60 words."""
+
+
+def prompt_size(messages: List[Dict]) -> int:
+    """Total characters of message content sent to the model"""
+    return sum(len(m.get("content") or "") for m in messages)
+
+
+def _turn(message) -> Dict:
+    """Prompt dict for a history entry, either a chat_history.Message or a role/content dict"""
+    if isinstance(message, dict):
+        return {"role": message.get("role"), "content": message.get("content") or ""}
+    return {"role": getattr(message, "role", None), "content": getattr(message, "content", None) or ""}
+
+
+def build_messages(history: List, retrieval_query: Optional[str] = None,
+                   top_k: Optional[int] = None, max_chars: Optional[int] = None) -> List[Dict]:
+    """
+    Assemble the messages for one AI call.
+
+    history is the session transcript (Message records or role/content
+    dicts) ending with the current user turn.
+    The system message carries only the top_k knowledge-base snippets for
+    retrieval_query (defaults to the current user turn), then as much recent
+    history as fits under max_chars. The current user turn is always kept,
+    truncated if it alone would blow the cap.
+    """
+    top_k = Config.PROMPT_TOP_K if top_k is None else top_k
+    max_chars = Config.PROMPT_MAX_CHARS if max_chars is None else max_chars
+
+    turns = [turn for turn in map(_turn, history) if turn["role"] in ("user", "assistant")]
+    current = turns.pop() if turns else {"role": "user", "content": retrieval_query or ""}
+    query = retrieval_query or current["content"]
+
+    system_content = SYSTEM_PROMPT
+    snippets = get_knowledge_base().search(query, top_k)
+    if snippets:
+        system_content += "\n\nSchool facts:\n" + "\n".join(f"- {s}" for s in snippets)
+
+    # The system prompt and the current question take priority over facts and history
+    budget = max_chars - len(SYSTEM_PROMPT)
+    if len(current["content"]) > budget:
+        current["content"] = current["content"][:max(budget, 0)]
+    budget -= len(current["content"])
+    if len(system_content) - len(SYSTEM_PROMPT) > budget:
+        system_content = SYSTEM_PROMPT
+    budget -= len(system_content) - len(SYSTEM_PROMPT)
+
+    kept: List[Dict] = []
+    for turn in reversed(turns):
+        if len(turn["content"]) > budget:
+            break
+        kept.append(turn)
+        budget -= len(turn["content"])
+    kept.reverse()
+
+    return [{"role": "system", "content": system_content}] + kept + [current]
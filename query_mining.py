@@ -0,0 +1,242 @@
+"""
+Offline mining of questions the local tiers could not answer.
+
+Every stored question is classified by the tier that answered it (the
+source saved with the reply, or read off its text for older sessions) and
+replayed against the current knowledge base. Follow-ups such as "its
+timing?" are replayed with the event the conversation was about, as /ask
+does, and a miss is credited to that event. Those that went to the AI and
+still miss locally are clustered by shared words and ranked by frequency,
+each with a suggested school_data.json alias for a nearby key or a new
+entry to add.
+"""
+
+import difflib
+import os
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+import session_codec
+from chat_history import ChatHistoryManager
+from conclave_response import FOLLOW_UP_KEYWORDS, context_event, is_follow_up
+from knowledge_base import get_knowledge_base, tokenize
+from session_bulk import run_pool, session_files
+
+# Answer sources as reported by /ask; the last three mean the question went to the AI tier
+LOCAL_TIERS = ("school", "conclave")
+AI_TIERS = ("ai", "ai_error", "degraded")
+
+AI_ERROR_PREFIXES = ("Sorry, the AI service", "Sorry, AI service", "Sorry, I couldn't", "Sorry, I'm having trouble")
+DEGRADED_PREFIXES = ("Here's what I found in the school information", "I'm getting a lot of questions right now")
+# Leading text of answers.py event renderings, to recognise answers rendered from older data
+CONCLAVE_PREFIXES = ("📌 ", "📖 Rules for ", "🏆 Prizes for ", "📅 ", "📍 Venue for ", "🎯 Format of ",
+                     "ℹ️ About ", "👥 ", "📝 ")
+
+
+@lru_cache(maxsize=1)
+def _local_answers() -> Dict[str, str]:
+    """Every rendered answer text -> the tier that gives it"""
+    kb = get_knowledge_base()
+    answers = {text: "school" for text in kb.school_answers.values()}
+    answers.update((text, "conclave") for text in kb.event_answers.values())
+    return answers
+
+
+def answer_tier(answer: str, local_answers: Dict[str, str]) -> str:
+    """Which tier produced a stored assistant reply"""
+    if answer in local_answers:
+        return local_answers[answer]
+    if answer.startswith(CONCLAVE_PREFIXES):
+        return "conclave"
+    if answer.startswith(AI_ERROR_PREFIXES):
+        return "ai_error"
+    if answer.startswith(DEGRADED_PREFIXES):
+        return "degraded"
+    return "ai"
+
+
+def answers_locally(query: str) -> bool:
+    from automation import get_school_info
+    from conclave_response import answer_conclave_query
+
+    return bool(get_school_info(query) or answer_conclave_query(query))
+
+
+def _terms(text: str) -> List[str]:
+    """Content words with a plural "s" dropped, so "labs" and "lab" cluster together"""
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t for t in tokenize(text)]
+
+
+# "timing", "prizes", ... say what is asked, not what about; they never name a missing entry
+FOLLOW_UP_TERMS = frozenset(_terms(" ".join(FOLLOW_UP_KEYWORDS)))
+
+
+def _subject_terms(question: str) -> List[str]:
+    return [t for t in _terms(question) if t not in FOLLOW_UP_TERMS]
+
+
+def _replay_session(path: str) -> List[Tuple[str, Optional[str], str, bool, bool]]:
+    """
+    (question, context entity, tier then, answered locally now, follow-up)
+    per answered question of one file. The entity is the event the previous
+    answers were about, as /ask remembers it, or else the last question
+    that stood on its own.
+    """
+    try:
+        messages = session_codec.load(path).get("messages", [])
+    except (OSError, ValueError):
+        return []
+    local_answers = _local_answers()
+    results, entity = [], None
+    for message, reply in zip(messages, messages[1:]):
+        if not (isinstance(message, dict) and isinstance(reply, dict)):
+            continue
+        if message.get("role") != "user" or reply.get("role") != "assistant":
+            continue
+        question = (message.get("content") or "").strip()
+        if not question:
+            continue
+        answer = reply.get("content") or ""
+        tier = reply.get("source")
+        if tier not in LOCAL_TIERS + AI_TIERS:
+            tier = answer_tier(answer, local_answers)
+        follow_up = not _terms(question) or (is_follow_up(question) and not _subject_terms(question))
+        now = tier in AI_TIERS and (answers_locally(question)
+                                    or follow_up and bool(entity) and answers_locally(f"{entity} {question}"))
+        results.append((question, entity if follow_up else None, tier, now, follow_up))
+        entity = context_event(answer) or (entity if follow_up else question)
+    return results
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def cluster(misses: List[Dict], threshold: float = 0.5) -> List[Dict]:
+    """
+    Group questions whose content words overlap by at least `threshold`
+    (Jaccard). Identical questions are merged first and the most frequent
+    question of each cluster seeds it; an inverted index keeps each
+    comparison to clusters sharing a word.
+    """
+    unique: Dict[str, Dict] = {}
+    for miss in misses:
+        text = " ".join(miss["question"].lower().split()).rstrip("?!. ")
+        entry = unique.setdefault(text, {"question": miss["question"], "count": 0, "sessions": set(),
+                                         "terms": miss["terms"], "follow_up": miss["follow_up"],
+                                         "source": miss["source"]})
+        entry["count"] += 1
+        entry["sessions"].add(miss["session_id"])
+
+    clusters: List[Dict] = []
+    by_term: Dict[str, List[int]] = {}
+    for text, entry in sorted(unique.items(), key=lambda item: (-item[1]["count"], item[0])):
+        terms = entry["terms"]
+        candidates = {i for term in terms for i in by_term.get(term, ())}
+        best, best_score = None, threshold
+        for i in candidates:
+            score = _jaccard(terms, clusters[i]["terms"])
+            if score >= best_score:
+                best, best_score = i, score
+        if best is None:
+            best = len(clusters)
+            clusters.append({"terms": terms, "count": 0, "sessions": set(), "questions": Counter(),
+                             "sources": Counter(), "term_counts": Counter(), "follow_ups": 0})
+            for term in terms:
+                by_term.setdefault(term, []).append(best)
+        group = clusters[best]
+        group["count"] += entry["count"]
+        group["sessions"] |= entry["sessions"]
+        group["questions"][entry["question"]] += entry["count"]
+        group["sources"][entry["source"]] += entry["count"]
+        group["follow_ups"] += entry["count"] if entry["follow_up"] else 0
+        for term in terms:
+            group["term_counts"][term] += entry["count"]
+    return clusters
+
+
+def _candidate_keys() -> List[Tuple[str, str, Set[str]]]:
+    """(section, key, words) for every key an alias can point at"""
+    kb = get_knowledge_base()
+    candidates = []
+    for section in ("locations", "infrastructure", "co_curricular"):
+        for key in kb.school_data.get(section, {}):
+            candidates.append((section, key, set(_terms(key))))
+    for key, event in kb.conclave_data.items():
+        if isinstance(event, dict):
+            candidates.append(("conclave", key, set(_terms(f"{key} {event.get('event_name', '')}"))))
+    return candidates
+
+
+def _matches(term: str, words: Set[str]) -> bool:
+    return term in words or bool(difflib.get_close_matches(term, words, n=1, cutoff=0.8))
+
+
+def suggest(group: Dict, candidates: List[Tuple[str, str, Set[str]]]) -> Dict:
+    """An alias for the nearest existing key, or a new entry to add"""
+    # Words in at least half of the cluster's questions, as the most common question spells them
+    core = {t for t, n in group["term_counts"].items() if n * 2 >= group["count"]}
+    top_source = group["sources"].most_common(1)[0][0]
+    phrase = " ".join(dict.fromkeys(w for w, t in zip(tokenize(top_source), _terms(top_source)) if t in core)) \
+        or " ".join(sorted(core))
+
+    best, best_score = None, 0.0
+    for section, key, words in candidates:
+        if not words:
+            continue
+        score = sum(1 for t in core if _matches(t, words)) / len(core | words)
+        if score > best_score:
+            best, best_score = (section, key), score
+    if best and best_score >= 0.3:
+        return {"action": "alias", "alias": phrase, "target": f"{best[0]}/{best[1]}", "score": round(best_score, 2)}
+    return {"action": "new_key", "key": phrase}
+
+
+def mine(manager: ChatHistoryManager, min_count: int = 2, threshold: float = 0.5,
+         workers: Optional[int] = None) -> Dict:
+    """
+    Replay every stored question and report the AI-tier questions the
+    local tiers still cannot answer, clustered and ranked by frequency.
+    """
+    get_knowledge_base()  # loaded once here so forked workers inherit it
+    paths = [e.path for e in session_files(manager.storage_dir)]
+    tiers: Counter = Counter()
+    misses: List[Dict] = []
+    now_local = orphans = 0
+    for path, results in zip(paths, run_pool(_replay_session, paths, "process", workers, "replaying")):
+        session_id = os.path.basename(path)[8:-5]
+        for question, entity, tier, answered_now, follow_up in results:
+            tiers[tier] += 1
+            if tier not in AI_TIERS:
+                continue
+            if answered_now:
+                now_local += 1
+                continue
+            # "when is it?" is about the entity the conversation was on, not an entry of its own
+            source = entity if follow_up else question
+            terms = set(_subject_terms(source)) if source else set()
+            if terms:
+                misses.append({"question": question, "session_id": session_id, "terms": terms,
+                               "follow_up": follow_up, "source": source})
+            elif follow_up:
+                orphans += 1
+
+    candidates = _candidate_keys()
+    clusters = [c for c in cluster(misses, threshold) if c["count"] >= min_count]
+    clusters.sort(key=lambda c: (-c["count"], -len(c["sessions"])))
+    return {
+        "sessions": len(paths),
+        "questions": sum(tiers.values()),
+        "tiers": dict(tiers),
+        "now_local": now_local,
+        "misses": len(misses),
+        "orphan_follow_ups": orphans,
+        "clusters": [{
+            "count": c["count"],
+            "sessions": len(c["sessions"]),
+            "follow_ups": c["follow_ups"],
+            "examples": [q for q, _ in c["questions"].most_common(3)],
+            "suggestion": suggest(c, candidates),
+        } for c in clusters],
+    }
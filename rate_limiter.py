@@ -0,0 +1,211 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from log_setup import get_logger, kv
+
+try:
+    import redis  # optional: shared buckets across workers/instances
+except ImportError:
+    redis = None
+
+log = get_logger("rate_limiter")
+
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """Parse "capacity/seconds" (e.g. "5/60") into (capacity, tokens refilled per second)"""
+    capacity, _, seconds = str(spec).partition("/")
+    capacity = float(capacity)
+    seconds = float(seconds or 1)
+    return capacity, capacity / seconds
+
+
+# (key, capacity, tokens refilled per second) of one bucket
+Bucket = Tuple[str, float, float]
+
+
+class InMemoryBackend:
+    """Token buckets held in this process"""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}   # key -> [tokens, updated_at, seconds to refill completely]
+        self._lock = threading.Lock()
+
+    def take(self, buckets: List[Bucket], cost: float = 1.0) -> int:
+        """
+        Take cost from every bucket, or from none of them if any is short;
+        returns the index of the first bucket that was short, -1 if allowed
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = []
+            for key, capacity, refill_rate in buckets:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    if len(self._buckets) >= self.max_keys:
+                        self._prune(now)
+                    full_after = capacity / refill_rate if refill_rate else 0
+                    bucket = self._buckets[key] = [capacity, now, full_after]
+                states.append((bucket, min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)))
+            denied = next((i for i, (_, tokens) in enumerate(states) if tokens < cost), -1)
+            for bucket, tokens in states:
+                bucket[0], bucket[1] = tokens - cost if denied < 0 else tokens, now
+            return denied
+
+    def peek(self, key: str, capacity: float, refill_rate: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return capacity
+            return min(capacity, bucket[0] + (time.monotonic() - bucket[1]) * refill_rate)
+
+    def key_count(self, prefix: str) -> int:
+        with self._lock:
+            return sum(1 for k in self._buckets if k.startswith(prefix))
+
+    def _prune(self, now: float):
+        # Buckets that would have refilled completely carry no state worth keeping
+        for k in [k for k, (_, ts, full_after) in self._buckets.items() if now - ts >= full_after]:
+            del self._buckets[k]
+
+
+class RedisBackend:
+    """Token buckets shared through Redis so every worker sees the same budget"""
+
+    name = "redis"
+
+    # Atomic refill-and-take across all KEYS, all or nothing; keys expire once they would be full again.
+    # ARGV: cost, now, then capacity and rate per key. Returns the 1-based index of the first short key, or 0.
+    SCRIPT = """
+local cost = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local tokens = {}
+local denied = 0
+for i = 1, #KEYS do
+  local capacity = tonumber(ARGV[1 + 2 * i])
+  local rate = tonumber(ARGV[2 + 2 * i])
+  local b = redis.call('HMGET', KEYS[i], 't', 'ts')
+  local t = tonumber(b[1]) or capacity
+  local ts = tonumber(b[2]) or now
+  tokens[i] = math.min(capacity, t + (now - ts) * rate)
+  if denied == 0 and tokens[i] < cost then
+    denied = i
+  end
+end
+for i = 1, #KEYS do
+  local capacity = tonumber(ARGV[1 + 2 * i])
+  local rate = tonumber(ARGV[2 + 2 * i])
+  if denied == 0 then
+    tokens[i] = tokens[i] - cost
+  end
+  redis.call('HSET', KEYS[i], 't', tokens[i], 'ts', now)
+  if rate > 0 then
+    redis.call('PEXPIRE', KEYS[i], math.ceil(capacity / rate * 1000) + 1000)
+  end
+end
+return denied
+"""
+
+    def __init__(self, url: str, prefix: str = "gyan:rl:"):
+        if redis is None:
+            raise RuntimeError("redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, buckets: List[Bucket], cost: float = 1.0) -> int:
+        args = [cost, time.time()]
+        for _, capacity, refill_rate in buckets:
+            args += [capacity, refill_rate]
+        return int(self._take(keys=[self.prefix + key for key, _, _ in buckets], args=args)) - 1
+
+    def peek(self, key: str, capacity: float, refill_rate: float) -> float:
+        tokens, ts = self.client.hmget(self.prefix + key, "t", "ts")
+        if tokens is None:
+            return capacity
+        return min(capacity, float(tokens) + (time.time() - float(ts)) * refill_rate)
+
+    def key_count(self, prefix: str) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}{prefix}*", count=500))
+
+
+class RateLimiter:
+    """A named pair of token buckets: one per session and one shared by everybody"""
+
+    def __init__(self, name: str, session_rate: str, global_rate: str, backend):
+        self.name = name
+        self.backend = backend
+        self.session_capacity, self.session_refill = parse_rate(session_rate)
+        self.global_capacity, self.global_refill = parse_rate(global_rate)
+        self.allowed = 0
+        self.denied_session = 0
+        self.denied_global = 0
+
+    def allow(self, session_id: str) -> bool:
+        """Take one token from both the session and the global bucket, or from neither"""
+        try:
+            denied = self.backend.take([
+                (f"{self.name}:session:{session_id}", self.session_capacity, self.session_refill),
+                (f"{self.name}:global", self.global_capacity, self.global_refill),
+            ])
+            if denied == 0:
+                self.denied_session += 1
+                return False
+            if denied == 1:
+                self.denied_global += 1
+                return False
+        except Exception as e:
+            # A broken shared backend must not take the chatbot down with it
+            log.warning("Rate limiter backend error, allowing request", extra=kv(limiter=self.name, error=str(e)))
+        self.allowed += 1
+        return True
+
+    def retry_after(self, session_id: str) -> int:
+        """Seconds until both buckets hold at least one token again"""
+        waits = []
+        for key, capacity, refill in (
+            (f"{self.name}:session:{session_id}", self.session_capacity, self.session_refill),
+            (f"{self.name}:global", self.global_capacity, self.global_refill),
+        ):
+            try:
+                tokens = self.backend.peek(key, capacity, refill)
+            except Exception:
+                tokens = capacity
+            if tokens < 1 and refill > 0:
+                waits.append((1 - tokens) / refill)
+        return max(1, int(max(waits, default=0) + 0.999))
+
+    def status(self) -> Dict:
+        try:
+            global_tokens = round(self.backend.peek(f"{self.name}:global",
+                                                    self.global_capacity, self.global_refill), 2)
+            tracked = self.backend.key_count(f"{self.name}:session:")
+        except Exception as e:
+            global_tokens, tracked = None, None
+            log.warning("Rate limiter status unavailable", extra=kv(limiter=self.name, error=str(e)))
+        return {
+            "backend": self.backend.name,
+            "session_limit": {"capacity": self.session_capacity, "refill_per_sec": self.session_refill},
+            "global_limit": {"capacity": self.global_capacity, "refill_per_sec": self.global_refill},
+            "global_tokens_available": global_tokens,
+            "tracked_sessions": tracked,
+            "allowed": self.allowed,
+            "denied_session": self.denied_session,
+            "denied_global": self.denied_global,
+        }
+
+
+def make_backend(redis_url: Optional[str] = None):
+    """Use Redis when a URL is configured and reachable, else fall back to in-process buckets"""
+    if redis_url:
+        try:
+            backend = RedisBackend(redis_url)
+            backend.client.ping()
+            log.info("Rate limiter using shared Redis backend")
+            return backend
+        except Exception as e:
+            log.warning("Redis rate-limit backend unavailable, using in-process buckets", extra=kv(error=str(e)))
+    return InMemoryBackend()
@@ -0,0 +1,194 @@
+"""
+Bulk maintenance over every stored chat session, spread across a worker pool.
+
+Parsing session files is CPU-bound, so export and reindex use processes;
+cleanup only stats and unlinks files, so it uses threads. Every operation
+reports progress and supports a dry run that changes nothing.
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import session_codec
+from chat_history import ChatHistoryManager, Message, read_session_info
+from session_index import SessionIndex
+
+try:
+    import pyarrow  # optional: Parquet export
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+EXPORT_COLUMNS = ("session_id", "seq", "role", "content", "timestamp")
+
+
+class Progress:
+    """`label: done/total (pct)` on one stderr line, redrawn at most every `interval` seconds"""
+
+    def __init__(self, label: str, total: int, interval: float = 0.5, stream=None):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self._last = 0.0
+
+    def step(self, n: int = 1):
+        self.done += n
+        now = time.monotonic()
+        if now - self._last >= self.interval or self.done == self.total:
+            self._last = now
+            pct = self.done / self.total * 100 if self.total else 100
+            self.stream.write(f"\r   {self.label}: {self.done}/{self.total} ({pct:.0f}%)")
+            self.stream.flush()
+
+    def finish(self):
+        if self.total:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def session_files(storage_dir: str) -> List[os.DirEntry]:
+    with os.scandir(storage_dir) as entries:
+        return [e for e in entries if e.name.startswith("session_") and e.name.endswith(".json")]
+
+
+def _pool(kind: str, workers: Optional[int]):
+    workers = workers or os.cpu_count() or 1
+    return ProcessPoolExecutor(workers) if kind == "process" else ThreadPoolExecutor(workers)
+
+
+def run_pool(fn: Callable, items: List, kind: str, workers: Optional[int], label: str) -> Iterator:
+    """fn over items on a pool, yielding results in order while reporting progress"""
+    progress = Progress(label, len(items))
+    chunksize = max(1, len(items) // ((workers or os.cpu_count() or 1) * 8)) if kind == "process" else 1
+    try:
+        with _pool(kind, workers) as pool:
+            for result in pool.map(fn, items, chunksize=chunksize):
+                progress.step()
+                yield result
+    finally:
+        progress.finish()
+
+
+def _stat_and_maybe_remove(args) -> Optional[Dict]:
+    path, cutoff, dry_run = args
+    try:
+        stat = os.stat(path)
+        if stat.st_mtime >= cutoff:
+            return None
+        if not dry_run:
+            os.remove(path)
+        return {"session_id": os.path.basename(path)[8:-5], "size_bytes": stat.st_size}
+    except FileNotFoundError:
+        return None
+
+
+def cleanup(manager: ChatHistoryManager, days: int, dry_run: bool = False,
+            workers: Optional[int] = None) -> Dict:
+    """Delete sessions whose file was last modified more than `days` ago"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+    paths = [(e.path, cutoff, dry_run) for e in session_files(manager.storage_dir)]
+    removed = [r for r in run_pool(_stat_and_maybe_remove, paths, "thread", workers, "checking") if r]
+    if not dry_run:
+        for item in removed:
+            manager.index.remove(item["session_id"])
+            manager.feed.publish("deleted", {"session_id": item["session_id"]})
+    return {"scanned": len(paths), "deleted": len(removed),
+            "bytes": sum(r["size_bytes"] for r in removed), "dry_run": dry_run}
+
+
+def _read_info(path: str) -> Optional[Dict]:
+    return read_session_info(path, os.path.basename(path)[8:-5])
+
+
+def reindex(manager: ChatHistoryManager, dry_run: bool = False, workers: Optional[int] = None) -> Dict:
+    """
+    Rebuild the metadata index from the session files. A dry run only
+    compares: sessions missing from the index, index entries without a
+    file, and entries whose message count or size differ.
+    """
+    paths = [e.path for e in session_files(manager.storage_dir)]
+    infos = [i for i in run_pool(_read_info, paths, "process", workers, "reading") if i]
+    on_disk = {i["session_id"]: i for i in infos}
+    # Read the index file directly: the manager would build a missing index, which a dry run must not do
+    index = SessionIndex(manager.storage_dir)
+    indexed = {i["session_id"]: i for i in index.all()} if index.exists() else {}
+    report = {
+        "sessions": len(on_disk),
+        "missing": len(on_disk.keys() - indexed.keys()),
+        "orphaned": len(indexed.keys() - on_disk.keys()),
+        "stale": sum(1 for sid in on_disk.keys() & indexed.keys()
+                     if (on_disk[sid]["message_count"], on_disk[sid]["size_bytes"])
+                     != (indexed[sid].get("message_count"), indexed[sid].get("size_bytes"))),
+        "dry_run": dry_run,
+    }
+    if not dry_run:
+        manager.rebuild_index(infos)
+    return report
+
+
+def _read_rows(path: str) -> List[Dict]:
+    """One export row per message of a session file"""
+    session_id = os.path.basename(path)[8:-5]
+    try:
+        messages = session_codec.load(path).get("messages", [])
+    except (OSError, ValueError):
+        return []
+    rows = []
+    for seq, raw in enumerate(messages):
+        if not isinstance(raw, dict):
+            continue
+        message = Message.from_dict(raw).to_dict()
+        rows.append({"session_id": session_id, "seq": seq, "role": message["role"],
+                     "content": message["content"], "timestamp": message.get("timestamp")})
+    return rows
+
+
+def _write_jsonl(path: str, batches: Iterable[List[Dict]]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in batches:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += len(rows)
+    return count
+
+
+def _write_parquet(path: str, batches: Iterable[List[Dict]]) -> int:
+    if pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    for rows in batches:
+        for row in rows:
+            for name in EXPORT_COLUMNS:
+                columns[name].append(row[name])
+    pyarrow.parquet.write_table(pyarrow.table(columns), path, compression="zstd")
+    return len(columns["session_id"])
+
+
+def export(manager: ChatHistoryManager, path: str, fmt: str = "jsonl", dry_run: bool = False,
+           workers: Optional[int] = None) -> Dict:
+    """
+    Write every message of every session to one file, one row per message
+    with EXPORT_COLUMNS: JSON lines, or a Parquet table for analytics tools.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    paths = sorted(e.path for e in session_files(manager.storage_dir))
+    batches = run_pool(_read_rows, paths, "process", workers, "exporting")
+    if dry_run:
+        rows = sum(len(batch) for batch in batches)
+    elif fmt == "parquet":
+        rows = _write_parquet(path, batches)
+    else:
+        rows = _write_jsonl(path, batches)
+    return {"sessions": len(paths), "rows": rows, "path": path, "format": fmt, "dry_run": dry_run}
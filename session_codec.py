@@ -0,0 +1,86 @@
+"""
+Encodings for chat session files.
+
+Sessions are written compactly in the configured format: "json"
+(stdlib, no indentation), "orjson" (the same JSON, encoded faster) or
+"msgpack" (binary, smaller). Reads detect the format from the first byte,
+so files written before a format change, including the old indented JSON,
+keep loading. File names stay session_<id>.json whatever the encoding.
+"""
+
+import json
+from typing import Dict
+
+from log_setup import get_logger, kv
+
+try:
+    import orjson  # optional: faster JSON encode/decode
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # optional: binary encoding
+except ImportError:
+    msgpack = None
+
+log = get_logger("session_codec")
+
+FORMATS = ("json", "orjson", "msgpack")
+
+# First byte of a msgpack map (fixmap, map 16, map 32); JSON objects start with "{" or whitespace
+_MSGPACK_MAP = set(range(0x80, 0x90)) | {0xde, 0xdf}
+_BOM = b"\xef\xbb\xbf"
+
+_warned = set()
+
+
+def available(fmt: str) -> bool:
+    return fmt == "json" or (fmt == "orjson" and orjson is not None) or (fmt == "msgpack" and msgpack is not None)
+
+
+def resolve(fmt: str) -> str:
+    """fmt if it can be written here, else "json" (warning once per format)"""
+    if fmt in FORMATS and available(fmt):
+        return fmt
+    if fmt not in _warned:
+        _warned.add(fmt)
+        log.warning("Session format unavailable, writing compact JSON", extra=kv(
+            format=fmt, hint="pip install orjson msgpack" if fmt in FORMATS else f"expected one of {FORMATS}"))
+    return "json"
+
+
+def encode(data: Dict, fmt: str = "json") -> bytes:
+    if fmt == "msgpack":
+        return msgpack.packb(data, use_bin_type=True)
+    if fmt == "orjson":
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def detect(raw: bytes) -> str:
+    return "msgpack" if raw and raw[0] in _MSGPACK_MAP else "json"
+
+
+def decode(raw: bytes) -> Dict:
+    if detect(raw) == "msgpack":
+        if msgpack is None:
+            raise ValueError("session file is msgpack-encoded; install msgpack to read it")
+        return msgpack.unpackb(raw, raw=False)
+    if raw.startswith(_BOM):
+        raw = raw[len(_BOM):]
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def load(path: str) -> Dict:
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def dump(path: str, data: Dict, fmt: str = "json") -> int:
+    """Write data to path in fmt; returns the bytes written"""
+    raw = encode(data, fmt)
+    with open(path, "wb") as f:
+        f.write(raw)
+    return len(raw)
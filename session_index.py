@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from log_setup import get_logger, kv
+
+try:
+    import fcntl  # POSIX only: serialises journal writers across processes
+except ImportError:
+    fcntl = None
+
+log = get_logger("session_index")
+
+INDEX_FILE = "_index.jsonl"
+LOCK_FILE = "_index.lock"
+
+# Fields kept per session; everything an admin listing needs without opening the session file
+FIELDS = ("session_id", "created_at", "last_updated", "message_count", "last_message", "size_bytes")
+
+
+class SessionIndex:
+    """
+    Persistent session metadata, one small record per session.
+
+    The file is an append-only journal: every write appends the session's
+    new record (or a deletion marker) and the last line for a session wins.
+    Readers pick up lines appended by other processes since their last read,
+    and the journal is compacted once it holds many superseded lines.
+    rebuild() rewrites it from scratch. Writers hold an flock on a lock file
+    next to the journal, so a compaction in one process cannot drop a line
+    another process is appending (without fcntl only threads are serialised).
+    """
+
+    def __init__(self, storage_dir: str, compact_ratio: float = 3.0):
+        self.storage_dir = storage_dir
+        self.path = os.path.join(storage_dir, INDEX_FILE)
+        self.lock_path = os.path.join(storage_dir, LOCK_FILE)
+        self.compact_ratio = compact_ratio
+        self._entries: Dict[str, Dict] = {}
+        self._lines = 0
+        self._offset = 0
+        # The journal as last read, held open so its inode cannot be reused by a replacement
+        self._file = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _apply(self, line: str):
+        try:
+            record = json.loads(line)
+            session_id = record["session_id"]
+        except (ValueError, KeyError, TypeError):
+            return
+        self._lines += 1
+        if record.get("deleted"):
+            self._entries.pop(session_id, None)
+        else:
+            self._entries[session_id] = record
+
+    def _reset(self, f=None):
+        if self._file is not None:
+            self._file.close()
+        self._entries, self._lines, self._offset, self._file = {}, 0, 0, f
+
+    def _refresh(self):
+        """Read lines appended since the last read; reload if the journal was replaced"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if self._file is not None and os.fstat(self._file.fileno()).st_ino == stat.st_ino \
+                and stat.st_size == self._offset:
+            return
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._reset()
+            return
+        # Read through a fresh handle: the held one may be shared with forked workers, offset included
+        with f:
+            stat = os.fstat(f.fileno())
+            if self._file is None or os.fstat(self._file.fileno()).st_ino != stat.st_ino \
+                    or stat.st_size < self._offset:
+                self._reset(os.fdopen(os.dup(f.fileno()), "rb"))
+            f.seek(self._offset)
+            data = f.read()
+        # A line still being written by another process is picked up on the next read
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].decode("utf-8", errors="replace").splitlines():
+            self._apply(line)
+        self._offset += complete
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive right to append to or replace the journal, within and across processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def update(self, info: Dict):
+        record = {field: info.get(field) for field in FIELDS}
+        with self._writing():
+            self._refresh()
+            self._append(record)
+            self._refresh()
+            self._maybe_compact()
+
+    def remove(self, session_id: str) -> bool:
+        """Drop a session's record; False if it was not indexed"""
+        with self._writing():
+            self._refresh()
+            if session_id not in self._entries:
+                return False
+            self._append({"session_id": session_id, "deleted": True})
+            self._refresh()
+            self._maybe_compact()
+            return True
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(session_id)
+            return dict(entry) if entry else None
+
+    def all(self) -> List[Dict]:
+        """Every indexed session, most recently updated first"""
+        with self._lock:
+            self._refresh()
+            entries = [dict(e) for e in self._entries.values()]
+        entries.sort(key=lambda e: e.get("last_updated") or "", reverse=True)
+        return entries
+
+    def _write(self, entries: Iterable[Dict]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _maybe_compact(self):
+        if self._lines > 100 and self._lines > self.compact_ratio * len(self._entries):
+            self._write(self._entries.values())
+            self._refresh()
+
+    def rebuild(self, infos: Iterable[Dict]) -> int:
+        """Replace the index with the given session records; returns how many were indexed"""
+        records = [{field: info.get(field) for field in FIELDS} for info in infos]
+        with self._writing():
+            self._write(records)
+            self._refresh()
+        log.info("Rebuilt session index", extra=kv(path=self.path, sessions=len(records)))
+        return len(records)
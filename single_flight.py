@@ -0,0 +1,103 @@
+import hashlib
+import json
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised to a waiting caller when the shared call does not finish in time"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self.abandoned = False  # on_lead refused, fn never ran
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one.
+
+    The first caller for a key runs fn; callers arriving while it is still
+    running wait for it and get the same result, or the same exception.
+    Nothing is cached once the call completes.
+
+    on_lead, if given, runs only for the caller that is about to run fn
+    (admission control, say). If it raises, fn is not run, the exception
+    goes to that caller alone, and callers that joined meanwhile start over
+    as if they had just arrived.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, fn: Callable, timeout: Optional[float] = None,
+           on_lead: Optional[Callable] = None) -> Tuple[object, bool]:
+        """Run fn once per in-flight key; returns (result, shared)"""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    call.waiters += 1
+            if leader:
+                break
+            if not call.done.wait(timeout):
+                self.timeouts += 1
+                raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for shared call")
+            if call.abandoned:
+                continue
+            self.shared += 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        if on_lead is not None:
+            try:
+                on_lead()
+            except BaseException:
+                with self._lock:
+                    del self._calls[key]
+                call.abandoned = True
+                call.done.set()
+                raise
+        self.leaders += 1
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def status(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"in_flight": in_flight, "leaders": self.leaders, "shared": self.shared, "timeouts": self.timeouts}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def prompt_key(messages: List[Dict]) -> str:
+    """Key equal for prompts that differ only in case, punctuation or spacing"""
+    canonical = [(m.get("role"), _normalize(m.get("content"))) for m in messages]
+    return hashlib.sha1(json.dumps(canonical).encode("utf-8")).hexdigest()
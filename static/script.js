@@ -2,6 +2,55 @@ const chat = document.getElementById("chat");
 const form = document.getElementById("chat-form");
 const input = document.getElementById("query");
 const ttsToggle = document.getElementById("ttsToggle");
+const sendBtn = form.querySelector("button[type=submit]");
+const voiceBtn = document.getElementById("voiceBtn");
+
+// School and conclave answers depend only on the question and the server's knowledge-base
+// version (X-KB-Version), so repeats are answered from here without a round trip
+const ANSWER_CACHE_SIZE = 50;
+const answerCache = new Map(); // cacheKey -> { answer, kbVersion, expires }, oldest first
+let kbVersion = null;
+let inFlight = false;
+
+// Must match cache_key() in app.py
+function cacheKey(query) {
+  return query.toLowerCase().split(/\s+/).filter(Boolean).join(" ").replace(/[?!. ]+$/, "");
+}
+
+function cachedAnswer(key) {
+  const entry = answerCache.get(key);
+  if (!entry) return null;
+  answerCache.delete(key);
+  if (entry.kbVersion !== kbVersion || entry.expires < Date.now()) return null;
+  answerCache.set(key, entry); // most recently used goes last
+  return entry.answer;
+}
+
+function rememberAnswer(key, res, data) {
+  const version = res.headers.get("X-KB-Version");
+  if (version && version !== kbVersion) {
+    answerCache.clear(); // the data changed; earlier answers may be stale
+    kbVersion = version;
+  }
+  const maxAge = /max-age=(\d+)/.exec(res.headers.get("Cache-Control") || "");
+  if (!data.cacheable || !version || !maxAge) return;
+  answerCache.set(key, { answer: data.answer, kbVersion: version, expires: Date.now() + maxAge[1] * 1000 });
+  while (answerCache.size > ANSWER_CACHE_SIZE) {
+    answerCache.delete(answerCache.keys().next().value);
+  }
+}
+
+function setBusy(busy) {
+  inFlight = busy;
+  sendBtn.disabled = busy;
+  if (voiceBtn) voiceBtn.disabled = busy;
+}
+
+function speak(text) {
+  if (ttsToggle.checked && "speechSynthesis" in window) {
+    window.speechSynthesis.speak(new SpeechSynthesisUtterance(text));
+  }
+}
 
 function appendMessage(who, text) {
   const div = document.createElement("div");
@@ -12,8 +61,18 @@ function appendMessage(who, text) {
 }
 
 async function ask(query) {
+  if (inFlight) return; // one question at a time
   appendMessage("user", query);
 
+  const key = cacheKey(query);
+  const cached = cachedAnswer(key);
+  if (cached) {
+    appendMessage("jarvis", cached);
+    speak(cached);
+    return;
+  }
+  setBusy(true);
+
   // Show typing indicator
   const typing = document.createElement("div");
   typing.className = "msg jarvis typing";
@@ -28,23 +87,24 @@ async function ask(query) {
       body: JSON.stringify({ query }),
     });
     
-    if (!res.ok) {
+    // 429 still carries a friendly answer telling the user to slow down
+    if (!res.ok && res.status !== 429) {
       throw new Error(`HTTP error! status: ${res.status}`);
     }
     
     const data = await res.json();
+    rememberAnswer(key, res, data);
 
     typing.remove();
     appendMessage("jarvis", data.answer || "Sorry, I couldn't understand that.");
-
-    if (ttsToggle.checked && "speechSynthesis" in window) {
-      const utter = new SpeechSynthesisUtterance(data.answer);
-      window.speechSynthesis.speak(utter);
-    }
+    speak(data.answer);
   } catch (e) {
     typing.remove();
     appendMessage("jarvis", "Error talking to the server. Please check if the server is running.");
     console.error("Error details:", e);
+  } finally {
+    setBusy(false);
+    input.focus();
   }
 }
 
@@ -52,13 +112,13 @@ async function ask(query) {
 form.addEventListener("submit", (e) => {
   e.preventDefault();
   const q = input.value.trim();
-  if (!q) return;
+  if (!q || inFlight) return;
   input.value = "";
   ask(q);
 });
 
 // Voice input functionality
-document.getElementById('voiceBtn')?.addEventListener('click', function () {
+voiceBtn?.addEventListener('click', function () {
   if (!('webkitSpeechRecognition' in window) && !('SpeechRecognition' in window)) {
     alert("Your browser doesn't support speech recognition.");
     return;
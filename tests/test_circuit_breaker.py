@@ -0,0 +1,97 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def _tripped(clock):
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, min_calls=4, cooldown=30.0)
+    for _ in range(4):
+        breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_at_threshold_after_min_calls(clock):
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, min_calls=4)
+    breaker.record_failure(0.1)
+    breaker.record_failure(0.1)
+    assert breaker.state == CLOSED  # 100% failures, but fewer than min_calls
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED  # success does not re-check the rate
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN    # 3 of 5 failed
+    assert breaker.allow_request() is False
+    assert breaker.rejected == 1
+
+
+def test_slow_success_counts_as_failure(clock):
+    breaker = CircuitBreaker("test", min_calls=2, slow_call_seconds=5.0)
+    breaker.record_success(6.0)
+    breaker.record_success(7.0)
+    assert breaker.state == OPEN
+
+
+def test_cooldown_lets_a_single_probe_through(clock):
+    breaker = _tripped(clock)
+    clock.now += 29
+    assert breaker.available() is False
+    assert breaker.allow_request() is False
+
+    clock.now += 1
+    assert breaker.available() is True
+    assert breaker.allow_request() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.available() is False
+    assert breaker.allow_request() is False
+
+
+def test_released_probe_can_be_taken_again(clock):
+    breaker = _tripped(clock)
+    clock.now += 30
+    assert breaker.allow_request() is True
+    # The probe ended without a verdict (its deadline ran out, say): hand the slot back
+    breaker.release_probe()
+    assert breaker.state == HALF_OPEN
+    assert breaker.available() is True
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+
+def test_probe_success_closes(clock):
+    breaker = _tripped(clock)
+    clock.now += 30
+    assert breaker.allow_request() is True
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.status()["recent_calls"] == 0
+    assert breaker.allow_request() is True
+
+
+def test_probe_failure_reopens_for_another_cooldown(clock):
+    breaker = _tripped(clock)
+    clock.now += 30
+    assert breaker.allow_request() is True
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert breaker.status()["retry_in_seconds"] == 30.0
+    clock.now += 30
+    assert breaker.allow_request() is True
@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+import rate_limiter
+from rate_limiter import InMemoryBackend, RateLimiter, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", fake)
+    return fake
+
+
+def test_parse_rate():
+    assert parse_rate("5/60") == (5.0, 5.0 / 60)
+    assert parse_rate("10") == (10.0, 10.0)
+
+
+def test_take_is_all_or_nothing(clock):
+    backend = InMemoryBackend()
+    buckets = [("session", 5, 0.0), ("global", 1, 0.0)]
+
+    assert backend.take(buckets) == -1
+    # The global bucket is empty: nothing is taken from the session bucket either
+    for _ in range(3):
+        assert backend.take(buckets) == 1
+    assert backend.peek("session", 5, 0.0) == 4
+    assert backend.peek("global", 1, 0.0) == 0
+
+
+def test_take_reports_first_short_bucket(clock):
+    backend = InMemoryBackend()
+    assert backend.take([("a", 1, 0.0)]) == -1
+    assert backend.take([("a", 1, 0.0), ("b", 0, 0.0)]) == 0
+
+
+def test_buckets_refill_over_time(clock):
+    backend = InMemoryBackend()
+    bucket = [("k", 2, 1.0)]
+    assert backend.take(bucket) == -1
+    assert backend.take(bucket) == -1
+    assert backend.take(bucket) == 0
+    clock.now += 1.0
+    assert backend.take(bucket) == -1
+    clock.now += 100
+    assert backend.peek("k", 2, 1.0) == 2  # capped at capacity
+
+
+def test_prune_uses_each_buckets_own_refill_time(clock):
+    backend = InMemoryBackend(max_keys=2)
+    backend.take([("slow", 5, 5 / 60)])   # full again after 60s
+    backend.take([("fast", 30, 30.0)])    # full again after 1s
+    clock.now += 2
+    # Past max_keys: only the fast bucket has refilled completely, so only it is dropped
+    backend.take([("new", 30, 30.0)])
+    assert backend.key_count("") == 2
+    assert backend.peek("slow", 5, 5 / 60) < 5
+
+
+def test_global_denial_keeps_the_session_token(clock):
+    limiter = RateLimiter("ai", "2/60", "1/60", InMemoryBackend())
+    assert limiter.allow("a") is True
+    assert limiter.allow("b") is False
+    assert limiter.denied_global == 1
+    # Once the global bucket refills, b still has its whole session budget
+    clock.now += 60
+    assert limiter.allow("b") is True
+    clock.now += 60
+    assert limiter.allow("b") is True
+    assert limiter.denied_session == 0
+
+
+def test_session_limit_and_retry_after(clock):
+    limiter = RateLimiter("local", "2/10", "100/1", InMemoryBackend())
+    assert [limiter.allow("s") for _ in range(3)] == [True, True, False]
+    assert limiter.denied_session == 1
+    assert limiter.retry_after("s") == 5
+    assert limiter.allow("other") is True
+
+
+def test_concurrent_takes_never_overspend():
+    backend = InMemoryBackend()
+    limiter = RateLimiter("ai", "1000/3600", "50/3600", backend)
+    results = []
+
+    def worker(n):
+        results.extend(limiter.allow(f"s{n % 7}") for _ in range(20))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 50
+    assert limiter.allowed == 50
+
+
+def test_backend_error_allows_request():
+    class Broken:
+        name = "broken"
+
+        def take(self, buckets, cost=1.0):
+            raise ConnectionError("down")
+
+    assert RateLimiter("ai", "1/60", "1/60", Broken()).allow("s") is True
@@ -0,0 +1,73 @@
+import json
+import multiprocessing
+
+import pytest
+
+from session_index import SessionIndex, fcntl
+
+WRITERS = 4
+UPDATES = 300
+SESSIONS_PER_WRITER = 50
+
+
+def _write(storage_dir, writer):
+    # Low compact_ratio so journals are replaced many times while the others append
+    index = SessionIndex(storage_dir, compact_ratio=1.2)
+    for i in range(UPDATES):
+        index.update({"session_id": f"w{writer}-{i % SESSIONS_PER_WRITER}", "message_count": i})
+    # Every writer also deletes its first session
+    index.remove(f"w{writer}-0")
+
+
+def _journal(index):
+    with open(index.path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_last_record_wins_and_remove_hides(tmp_path):
+    index = SessionIndex(str(tmp_path))
+    index.update({"session_id": "a", "message_count": 1, "last_updated": "2025-01-01T00:00:00Z"})
+    index.update({"session_id": "b", "message_count": 1, "last_updated": "2025-01-02T00:00:00Z"})
+    index.update({"session_id": "a", "message_count": 2, "last_updated": "2025-01-03T00:00:00Z"})
+
+    assert [e["session_id"] for e in index.all()] == ["a", "b"]
+    assert index.get("a")["message_count"] == 2
+    assert index.remove("a") is True
+    assert index.remove("a") is False
+    assert index.get("a") is None
+    # A second reader replays the journal to the same state
+    assert [e["session_id"] for e in SessionIndex(str(tmp_path)).all()] == ["b"]
+
+
+def test_compaction_keeps_one_line_per_session(tmp_path):
+    index = SessionIndex(str(tmp_path), compact_ratio=2.0)
+    for i in range(300):
+        index.update({"session_id": f"s{i % 10}", "message_count": i})
+
+    assert len(_journal(index)) < 300
+    assert {e["session_id"]: e["message_count"] for e in index.all()} == {f"s{n}": 290 + n for n in range(10)}
+
+
+def test_reader_follows_another_instances_appends(tmp_path):
+    writer, reader = SessionIndex(str(tmp_path)), SessionIndex(str(tmp_path))
+    writer.update({"session_id": "a", "message_count": 1})
+    assert reader.get("a")["message_count"] == 1
+    writer.update({"session_id": "a", "message_count": 2})
+    assert reader.get("a")["message_count"] == 2
+
+
+@pytest.mark.skipif(fcntl is None, reason="cross-process locking needs fcntl")
+def test_concurrent_processes_with_compaction_lose_nothing(tmp_path):
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=_write, args=(str(tmp_path), n)) for n in range(WRITERS)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    entries = {e["session_id"]: e for e in SessionIndex(str(tmp_path)).all()}
+    expected = {f"w{n}-{s}" for n in range(WRITERS) for s in range(1, SESSIONS_PER_WRITER)}
+    assert set(entries) == expected
+    # Each session's last update is the one that survives
+    assert all(e["message_count"] >= UPDATES - SESSIONS_PER_WRITER for e in entries.values())
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight, SingleFlightTimeout, prompt_key
+
+
+def _run_concurrently(n, target):
+    results, errors = [], []
+
+    def wrapper():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapper) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(flight, key, n):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters >= n:
+                return
+        time.sleep(0.001)
+    raise AssertionError(f"{n} waiters never joined {key!r}")
+
+
+def _join(threads):
+    for thread in threads:
+        thread.join(5)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = _run_concurrently(5, lambda: flight.do("k", fn))
+    _wait_for_waiters(flight, "k", 4)
+    release.set()
+    _join(threads)
+
+    assert not errors
+    assert calls == [1]
+    assert sorted(results, key=lambda r: r[1]) == [("answer", False)] + [("answer", True)] * 4
+    assert flight.status() == {"in_flight": 0, "leaders": 1, "shared": 4, "timeouts": 0}
+
+
+def test_leader_error_reaches_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("backend down")
+
+    threads, results, errors = _run_concurrently(4, lambda: flight.do("k", fn))
+    _wait_for_waiters(flight, "k", 3)
+    release.set()
+    _join(threads)
+
+    assert not results
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    assert not flight.in_flight("k")
+
+
+def test_refused_leader_makes_waiters_retry():
+    flight = SingleFlight()
+    entered = threading.Event()
+    release = threading.Event()
+    admitted = []
+
+    def on_lead():
+        if not admitted:
+            admitted.append("refused")
+            entered.set()
+            release.wait(5)
+            raise RuntimeError("over budget")
+        admitted.append("ok")
+
+    def fn():
+        time.sleep(0.05)
+        return "answer"
+
+    first = threading.Thread(target=lambda: pytest.raises(RuntimeError, flight.do, "k", fn, on_lead=on_lead))
+    first.start()
+    entered.wait(5)
+    threads, results, errors = _run_concurrently(3, lambda: flight.do("k", fn, on_lead=on_lead))
+    _wait_for_waiters(flight, "k", 3)
+    release.set()
+    first.join(5)
+    _join(threads)
+
+    # The refusal went to the first caller only; one waiter took over as leader
+    assert not errors
+    assert admitted == ["refused", "ok"]
+    assert sorted(results, key=lambda r: r[1]) == [("answer", False), ("answer", True), ("answer", True)]
+    assert flight.leaders == 1
+
+
+def test_waiter_times_out():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(5)))
+    leader.start()
+    while not flight.in_flight("k"):
+        time.sleep(0.001)
+
+    with pytest.raises(SingleFlightTimeout):
+        flight.do("k", lambda: "never", timeout=0.05)
+    release.set()
+    leader.join(5)
+    assert flight.timeouts == 1
+
+
+def test_prompt_key_ignores_case_and_punctuation():
+    a = [{"role": "user", "content": "What is the fee?"}]
+    b = [{"role": "user", "content": "  what is the FEE "}]
+    c = [{"role": "user", "content": "what is the fee structure"}]
+    assert prompt_key(a) == prompt_key(b)
+    assert prompt_key(a) != prompt_key(c)
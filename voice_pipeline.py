@@ -0,0 +1,371 @@
+"""
+Voice assistant pipeline: capture, answer and speak on separate threads.
+
+    source --> capture thread --questions--> answer worker --sentences--> TTS thread --> speaker
+
+Answers are queued sentence by sentence, so speech starts as soon as the
+first sentence is ready, and the knowledge base warms up while the greeting
+plays. By default the source is not listened to while an answer is being
+produced or spoken, so a microphone never hears the assistant's own voice.
+With barge_in (e.g. on a headset) listening continues throughout: a new
+utterance abandons the turn in progress and cuts the speaker off, and
+utterances that repeat what was just spoken are dropped as echo. Sources and
+speakers are pluggable, so the pipeline runs the same against a microphone
+and pyttsx3, or against WAV files and a NullSpeaker in tests.
+"""
+
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from chat_history import Message
+from log_setup import get_logger, kv
+
+log = get_logger("voice")
+
+GREETING = "Hello! I am GYAN — your Guided Youth Assistance Network. How can I help you today?"
+NO_ANSWER = "I couldn't find any information related to that."
+EXIT_WORDS = ("exit", "stop")
+# Whole words only, so "nonstop" or "exited" do not end the session
+_EXIT_PATTERN = re.compile(r"\b(?:" + "|".join(EXIT_WORDS) + r")\b")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+# Words ending in "." that do not end a sentence ("Mrs. Jangra", "B.K. Birla")
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "sr", "jr", "no", "vs", "etc", "i.e", "e.g"}
+_END_OF_TURN = object()
+
+# Barge-in echo suppression: an utterance mostly made of words spoken in the last ECHO_WINDOW seconds
+ECHO_WINDOW = 10.0
+ECHO_OVERLAP = 0.6
+
+
+# 🎤 Sources: listen() returns the next utterance, "" for nothing understood, None when exhausted
+
+class MicrophoneSource:
+    """Default microphone through speech_recognition and Google's recognizer"""
+
+    def __init__(self):
+        import speech_recognition as sr  # deferred: slow to import, only needed for live audio
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def listen(self) -> Optional[str]:
+        with self.sr.Microphone() as source:
+            audio = self.recognizer.listen(source)
+        try:
+            return self.recognizer.recognize_google(audio)
+        except self.sr.UnknownValueError:
+            return ""
+        except self.sr.RequestError as e:
+            log.warning("Speech recognition service error", extra=kv(error=str(e)))
+            return ""
+
+
+class WavFileSource:
+    """
+    One utterance per WAV file. `transcribe(path)` defaults to
+    speech_recognition on the file; tests can pass their own.
+    """
+
+    def __init__(self, paths: Iterable[str], transcribe: Optional[Callable[[str], str]] = None):
+        self.paths = list(paths)
+        self.transcribe = transcribe or self._recognize
+
+    @staticmethod
+    def _recognize(path: str) -> str:
+        import speech_recognition as sr
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        try:
+            return recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            return ""
+
+    def listen(self) -> Optional[str]:
+        if not self.paths:
+            return None
+        return self.transcribe(self.paths.pop(0))
+
+
+class TextSource:
+    """Typed or scripted utterances: lines from an iterable (stdin by default)"""
+
+    def __init__(self, lines: Optional[Iterable[str]] = None):
+        self.lines = iter(lines if lines is not None else sys.stdin)
+
+    def listen(self) -> Optional[str]:
+        line = next(self.lines, None)
+        return None if line is None else line.strip()
+
+
+# 🔊 Speakers: say() blocks until the text is spoken or cut off. stop() may be called from any
+# thread; it only requests the cut-off, which the speaker carries out on the thread inside say()
+
+class Pyttsx3Speaker:
+    """
+    Local text-to-speech. pyttsx3 is not thread-safe, so the engine is
+    created, driven and stopped only on the thread that calls say(): stop()
+    sets an event that a per-word callback of the running engine acts on.
+    """
+
+    def __init__(self, rate: int = 170, echo: bool = True):
+        self.rate = rate
+        self.echo = echo
+        self._engine = None
+        self._stop_requested = threading.Event()
+
+    def _on_word(self, name, location, length):
+        if self._stop_requested.is_set():
+            self._engine.stop()  # runs inside runAndWait, on the speaking thread
+
+    def say(self, text: str):
+        self._stop_requested.clear()
+        if self.echo:
+            print(f"JARVIS: {text}")
+        if self._engine is None:
+            import pyttsx3  # deferred: initialising the TTS driver is slow
+            self._engine = pyttsx3.init()
+            self._engine.setProperty('rate', self.rate)
+            self._engine.connect('started-word', self._on_word)
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+    def stop(self):
+        self._stop_requested.set()
+
+
+class NullSpeaker:
+    """
+    Records what would have been said. With words_per_second it also takes
+    as long as speaking would, so barge-in can be exercised.
+    """
+
+    def __init__(self, words_per_second: Optional[float] = None, echo: bool = False):
+        self.words_per_second = words_per_second
+        self.echo = echo
+        self.spoken: List[str] = []
+        self.interrupted = 0
+        self._stopped = threading.Event()
+
+    def say(self, text: str):
+        self._stopped.clear()
+        if self.echo:
+            print(f"JARVIS: {text}")
+        self.spoken.append(text)
+        if self.words_per_second:
+            if self._stopped.wait(len(text.split()) / self.words_per_second):
+                self.interrupted += 1
+
+    def stop(self):
+        self._stopped.set()
+
+
+# 🧠 Answering
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences to queue for speech one at a time, so the first can start early"""
+    text = text or ""
+    sentences, start = [], 0
+    for match in _SENTENCE_END.finditer(text):
+        before = text[start:match.start()]
+        if "\n" not in match.group():
+            last_word = before.rsplit(None, 1)[-1].rstrip(".").lower() if before.strip() else ""
+            if last_word in _ABBREVIATIONS or len(last_word.rsplit(".", 1)[-1]) <= 1:
+                continue  # an abbreviation or initial, not the end of a sentence
+        sentences.append(before)
+        start = match.end()
+    sentences.append(text[start:])
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def warm_up():
+    """Load the knowledge base and AI router before the first question arrives"""
+    from ai_response import get_router
+    from knowledge_base import get_knowledge_base
+
+    get_knowledge_base()
+    get_router()
+
+
+def answer_query(query: str, history: List[Message]) -> Tuple[str, str]:
+    """
+    (source, answer) from the same tiers as the web app: pre-rendered school
+    and conclave answers from the shared knowledge base, then the AI with
+    the conversation so far (history ends with the current question).
+    """
+    from automation import get_school_info
+    from conclave_response import answer_conclave_query
+
+    answer = get_school_info(query)
+    if answer:
+        return "school", answer
+    answer = answer_conclave_query(query)
+    if answer:
+        return "conclave", answer
+
+    from ai_response import get_response
+    from prompt_builder import build_messages
+
+    return "ai", get_response(build_messages(history, retrieval_query=query))
+
+
+class VoicePipeline:
+    """Runs the three stages until the source is exhausted or the user says an exit word"""
+
+    def __init__(self, source, speaker, answer: Callable = answer_query, barge_in: bool = False,
+                 greeting: Optional[str] = GREETING, echo: bool = True):
+        self.source = source
+        self.speaker = speaker
+        self.answer = answer
+        self.barge_in = barge_in
+        self.greeting = greeting
+        self.echo = echo
+        self.history: List[Message] = []
+        self.turns: List[Dict] = []
+        self._questions: "queue.Queue" = queue.Queue()
+        self._speech: "queue.Queue" = queue.Queue()
+        self._turn = 0  # bumped on barge-in; queued work for older turns is dropped
+        self._outstanding = 0
+        self._idle = threading.Condition()
+        self._spoken: "deque" = deque()  # (time, words) of recent sentences, for echo suppression
+        self._spoken_lock = threading.Lock()
+
+    def _begin(self) -> int:
+        with self._idle:
+            self._outstanding += 1
+        return self._turn
+
+    def _end(self):
+        with self._idle:
+            self._outstanding -= 1
+            self._idle.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def interrupt(self):
+        """Barge-in: abandon the turn being answered or spoken"""
+        with self._idle:
+            busy = self._outstanding > 0
+            self._turn += 1
+        if busy:
+            self.speaker.stop()
+            log.info("Barge-in", extra=kv(sampled=True))
+
+    def _remember_spoken(self, sentence: str):
+        now = time.monotonic()
+        with self._spoken_lock:
+            self._spoken.append((now, set(re.findall(r"\w+", sentence.lower()))))
+            while self._spoken and now - self._spoken[0][0] > ECHO_WINDOW:
+                self._spoken.popleft()
+
+    def is_echo(self, text: str) -> bool:
+        """Whether an utterance is mostly words the speaker just said"""
+        words = re.findall(r"\w+", text.lower())
+        if not words:
+            return False
+        now = time.monotonic()
+        with self._spoken_lock:
+            recent = set().union(*(w for t, w in self._spoken if now - t <= ECHO_WINDOW))
+        return sum(1 for w in words if w in recent) / len(words) >= ECHO_OVERLAP
+
+    def say(self, text: str):
+        """Queue text to be spoken as its own turn"""
+        turn = self._begin()
+        for sentence in split_sentences(text):
+            self._speech.put((turn, sentence, None))
+        self._speech.put((turn, _END_OF_TURN, None))
+
+    def _capture(self):
+        while True:
+            if not self.barge_in:
+                self.wait_idle()
+            text = self.source.listen()
+            if text is None:
+                break
+            if not text:
+                continue
+            if self.barge_in and self.is_echo(text):
+                log.info("Ignored echo of own speech", extra=kv(sampled=True))
+                continue
+            if self.echo:
+                print(f"👤 You: {text}")
+            self.interrupt()
+            if _EXIT_PATTERN.search(text.lower()):
+                self.say("Goodbye!")
+                break
+            self._questions.put((self._begin(), text, time.perf_counter()))
+        self._questions.put(None)
+
+    def _answer_worker(self):
+        if self.answer is answer_query:
+            try:
+                warm_up()  # overlaps with the greeting being spoken
+            except Exception:
+                log.exception("Voice warm-up failed")
+        while True:
+            item = self._questions.get()
+            if item is None:
+                break
+            turn, question, heard_at = item
+            try:
+                if turn != self._turn:
+                    continue  # barged in before we got to it
+                self.history.append(Message("user", question))
+                source, answer = self.answer(question, self.history)
+                answer = answer or NO_ANSWER
+                self.history.append(Message("assistant", answer))
+                record = {"question": question, "source": source, "answer": answer,
+                          "answer_ms": round((time.perf_counter() - heard_at) * 1000, 1)}
+                self.turns.append(record)
+                for sentence in split_sentences(answer):
+                    self._speech.put((turn, sentence, (record, heard_at)))
+            except Exception:
+                log.exception("Error answering voice query")
+                self._speech.put((turn, "Sorry, something went wrong. Please try again.", None))
+            finally:
+                self._speech.put((turn, _END_OF_TURN, None))
+
+    def _speak_worker(self):
+        while True:
+            item = self._speech.get()
+            if item is None:
+                break
+            turn, sentence, timing = item
+            if sentence is _END_OF_TURN:
+                self._end()
+                continue
+            if turn != self._turn:
+                continue
+            if timing and "first_audio_ms" not in timing[0]:
+                timing[0]["first_audio_ms"] = round((time.perf_counter() - timing[1]) * 1000, 1)
+            if self.barge_in:
+                self._remember_spoken(sentence)
+            try:
+                self.speaker.say(sentence)
+            except Exception:
+                # A dead audio device must not take the thread down: the turn still has to end
+                log.exception("Error speaking answer")
+
+    def run(self):
+        speaker = threading.Thread(target=self._speak_worker, name="voice-tts", daemon=True)
+        worker = threading.Thread(target=self._answer_worker, name="voice-answer", daemon=True)
+        capture = threading.Thread(target=self._capture, name="voice-capture", daemon=True)
+        speaker.start()
+        worker.start()
+        if self.greeting:
+            self.say(self.greeting)
+        capture.start()
+
+        capture.join()
+        worker.join()
+        self.wait_idle()
+        self._speech.put(None)
+        speaker.join()
+        return self.turns